@@ -5,7 +5,8 @@ from graph_class import GraphWidget
 
 
 class ConfigurationViewer(QtWidgets.QDialog):
-    def __init__(self, config_min_cost, config_min_delay, config_optimal, packet_sizes, parent=None):
+    def __init__(self, config_min_cost, config_min_delay, config_optimal, packet_sizes, parent=None,
+                 delay_model=None):
         super().__init__(parent)
         self.setWindowTitle("Конфигурации сети")
         self.setGeometry(100, 100, 800, 600)
@@ -14,6 +15,7 @@ class ConfigurationViewer(QtWidgets.QDialog):
         self.config_min_delay = config_min_delay
         self.config_optimal = config_optimal
         self.packet_sizes = packet_sizes
+        self.delay_model = delay_model  # configurations.DelayModel для текущих потоков
 
         # Создаём вкладки
         self.tabs = QTabWidget()
@@ -47,9 +49,11 @@ class ConfigurationViewer(QtWidgets.QDialog):
         self.packet_size_combo = QComboBox()
         for pkg in self.packet_sizes:
             self.packet_size_combo.addItem(pkg['Размер пакета'])
-        self.packet_size_combo.currentIndexChanged.connect(
-            lambda: self.update_delay(tab, config)
+        packet_size_combo = self.packet_size_combo
+        packet_size_combo.currentIndexChanged.connect(
+            lambda: self.update_delay(tab, config, packet_size_combo.currentIndex())
         )
+        tab.delay_profile = None  # Задержки для всех размеров пакета, вычисляются один раз
 
         # Таблица с каналами и маршрутизаторами
         self.table = QTableWidget()
@@ -121,22 +125,19 @@ class ConfigurationViewer(QtWidgets.QDialog):
 
         self.graph_widget.plot(G, pos, edge_labels, node_labels)
 
-    def update_delay(self, tab, config):
+    def update_delay(self, tab, config, packet_index):
         """
-        Обновляет задержку при изменении размера пакета.
+        Обновляет задержку при изменении размера пакета. Задержки для всех размеров пакета
+        вычисляются при первом обращении и кэшируются на вкладке.
         """
-        packet_size = int(self.packet_size_combo.currentText().split()[0])  # Получаем размер пакета
-        config['average_delay'] = self.calculate_delay(config, packet_size)
+        if tab.delay_profile is None and self.delay_model is not None:
+            packet_sizes = [int(pkg['Размер пакета'].split()[0]) for pkg in self.packet_sizes]
+            tab.delay_profile = self.delay_model.delay_profile(config, packet_sizes)
+        config['average_delay'] = self.calculate_delay(tab, packet_index)
         self.update_tab(tab, config)
 
-    def calculate_delay(self, config, packet_size):
+    def calculate_delay(self, tab, packet_index):
         """
-        Вычисляет задержку для конфигурации.
+        Возвращает задержку сети конфигурации вкладки для размера пакета с номером packet_index.
         """
-        total_delay = 0
-        for edge, channel in config['channels'].items():
-            bandwidth = int(channel['Пропускная способность'].split()[0])
-            flow = 0  # Здесь нужно получить поток для ребра (пока заглушка)
-            if bandwidth > flow:
-                total_delay += packet_size / (bandwidth - flow)
-        return total_delay / len(config['channels']) if config['channels'] else 0
\ No newline at end of file
+        return float(tab.delay_profile.network_delays[packet_index]) if tab.delay_profile else 0
@@ -0,0 +1,943 @@
+import math
+import random
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations_with_replacement
+from math import prod
+
+import numpy as np
+
+
+class ConfigurationSpace:
+    """
+    Пространство конфигураций сети, заданное вариантами каналов для рёбер и маршрутизаторов для узлов.
+    Каждая конфигурация — число в смешанной системе счисления: разряд компонента принимает значения
+    от 0 до числа его вариантов, последний компонент меняется быстрее всех (как в itertools.product).
+    Конфигурации не хранятся: оценка идёт блоками номеров, а собирается только выбранная.
+    """
+
+    def __init__(self, channel_options, router_options):
+        self.channel_options = channel_options  # Ребро -> список вариантов каналов
+        self.router_options = router_options  # Узел -> список вариантов маршрутизаторов
+        self.edges = list(channel_options.keys())
+        self.nodes = list(router_options.keys())
+        self.options = list(channel_options.values()) + list(router_options.values())
+        self.radices = [len(options) for options in self.options]
+        self.size = prod(self.radices)
+
+    def digits(self, index):
+        """
+        digits(index) раскладывает номер конфигурации на номера вариантов для каждого компонента.
+        """
+        digits = [0] * len(self.radices)
+        for position in range(len(self.radices) - 1, -1, -1):
+            index, digits[position] = divmod(index, self.radices[position])
+        return digits
+
+    def build(self, digits):
+        """
+        build(digits) собирает конфигурацию из номеров вариантов компонентов.
+        """
+        channel_count = len(self.edges)
+        return {
+            'channels': {edge: self.options[i][digits[i]] for i, edge in enumerate(self.edges)},
+            'routers': {node: self.options[channel_count + i][digits[channel_count + i]]
+                        for i, node in enumerate(self.nodes)},
+        }
+
+
+def parse_number(value):
+    """parse_number(value) извлекает число из строки вида "800 бит/c" или "5000 рублей" """
+    return int(value.split()[0])
+
+
+def edge_delays(bandwidths, flows, packet_size):
+    """
+    Вычисляет задержку пакета на каналах: packet_size / (пропускная способность - поток)
+    или inf, если канал перегружен.
+    :return: массив NumPy задержек по каналам.
+    """
+    return edge_delay_matrix(bandwidths, flows, [packet_size])[0]
+
+
+def edge_delay_matrix(bandwidths, flows, packet_sizes):
+    """
+    Вычисляет задержки каналов сразу для всех размеров пакета. Задержка линейна по размеру пакета,
+    поэтому матрица получается одним внешним делением вектора размеров на запасы (C_e - f_e).
+    edge_delays — строка этой матрицы, так что формула задержки канала одна для всех потребителей.
+    :return: матрица NumPy «размер пакета × канал»; inf для перегруженных каналов.
+    """
+    bandwidths = np.asarray(bandwidths, dtype=float)
+    flows = np.asarray(flows, dtype=float)
+    packet_sizes = np.asarray(packet_sizes, dtype=float)
+    with np.errstate(divide='ignore'):
+        delays = np.divide.outer(packet_sizes, bandwidths - flows)
+    return np.where(bandwidths > flows, delays, np.inf)
+
+
+def flow_weights(flows, total_traffic=None):
+    """
+    Вычисляет веса каналов в задержке сети по Клейнроку: поток канала, делённый на суммарный
+    объём требований total_traffic (по умолчанию — сумма потоков каналов).
+    :return: массив NumPy весов.
+    """
+    flows = np.asarray(flows, dtype=float)
+    total = total_traffic or flows.sum()
+    return flows / total if total else np.zeros(len(flows))
+
+
+def option_tables(space, channel_flows, packet_size, total_traffic=None):
+    """
+    Вычисляет для каждого варианта каждого компонента его стоимость и вклад в задержку сети.
+    Вклад канала — его задержка (edge_delays), умноженная на вес канала (flow_weights), так что
+    задержка конфигурации равна сумме вкладов; у маршрутизаторов вклад нулевой.
+    :param total_traffic: Суммарный объём требований для весов каналов.
+    :return: (costs, delays) — списки списков в порядке компонентов пространства space.
+    """
+    costs = []
+    delays = []
+    flows = [channel_flows[edge] for edge in space.edges]
+    for weight, flow, options in zip(flow_weights(flows, total_traffic), flows, space.channel_options.values()):
+        costs.append([parse_number(channel['Стоимость аренды']) for channel in options])
+        bandwidths = [parse_number(channel['Пропускная способность']) for channel in options]
+        delays.append((weight * edge_delays(bandwidths, [flow] * len(options), packet_size)).tolist())
+    for options in space.router_options.values():
+        costs.append([parse_number(router['Стоимость']) for router in options])
+        delays.append([0] * len(options))
+    return costs, delays
+
+
+DelayProfile = namedtuple('DelayProfile', ['packet_sizes', 'edge_delays', 'network_delays', 'nodes', 'end_to_end'])
+
+
+class DelayModel:
+    """
+    Задержка сети по формуле Клейнрока: T = Σ (f_e / Γ) · packet_size / (C_e - f_e), где f_e — поток
+    канала, C_e — его пропускная способность, Γ — суммарный объём требований; и сквозные задержки
+    между парами узлов по сохранённым маршрутам. Единая реализация задержки для оптимизаторов,
+    вкладок конфигураций и окна просмотра.
+    """
+
+    def __init__(self, channel_flows, total_traffic=None, routing_matrix=None):
+        self.channel_flows = channel_flows
+        self.edges = [edge for edge, flow in channel_flows.items() if flow > 0]  # Порядок рёбер как в ConfigurationSpace
+        self.flows = np.array([channel_flows[edge] for edge in self.edges], dtype=float)
+        self.weights = flow_weights(self.flows, total_traffic)
+        self.routing_matrix = routing_matrix  # utils.RoutingMatrix или None
+
+    @staticmethod
+    def bandwidths(config, edges):
+        """bandwidths(config, edges) возвращает пропускные способности каналов конфигурации; 0, если канал не выбран"""
+        channels = config.get('channels', {})
+        return np.array([parse_number(channels[edge]['Пропускная способность']) if edge in channels else 0
+                         for edge in edges], dtype=float)
+
+    def edge_delays(self, config, packet_size):
+        """edge_delays(config, packet_size) возвращает задержки нагруженных каналов в порядке self.edges"""
+        return self.edge_delay_matrix(config, [packet_size])[0]
+
+    def edge_delay_matrix(self, config, packet_sizes):
+        """
+        edge_delay_matrix(config, packet_sizes) возвращает матрицу задержек «размер пакета × канал»
+        нагруженных каналов (в порядке self.edges) для всех размеров пакета сразу
+        """
+        return edge_delay_matrix(self.bandwidths(config, self.edges), self.flows, packet_sizes)
+
+    def network_delay(self, config, packet_size):
+        """
+        network_delay(config, packet_size) возвращает задержку сети T для конфигурации config.
+        Вклады каналов складываются слева направо (cumsum), как при оценке конфигураций в оптимизаторах,
+        поэтому значения совпадают до последнего бита.
+        """
+        return float(self.network_delays(config, [packet_size])[0])
+
+    def network_delays(self, config, packet_sizes, delays=None):
+        """
+        network_delays(config, packet_sizes) возвращает массив задержек сети T для каждого размера пакета.
+        :param delays: Готовая матрица edge_delay_matrix(config, packet_sizes), если она уже вычислена.
+        """
+        if delays is None:
+            delays = self.edge_delay_matrix(config, packet_sizes)
+        if not self.edges:
+            return np.zeros(len(delays))
+        return (self.weights * delays).cumsum(axis=1)[:, -1]
+
+    def end_to_end_delays(self, config, packet_size):
+        """
+        Вычисляет сквозную задержку каждого требования — сумму задержек каналов его маршрута
+        (при делении требования между путями — с весами долей).
+        :return: (nodes, matrix): имена узлов и матрица задержек «источник × получатель»,
+                 nan — для пар без требования, маршрута или объёма; None, если маршруты не сохранены.
+        """
+        result = self.end_to_end_delay_matrices(config, [packet_size])
+        return None if result is None else (result[0], result[1][0])
+
+    def end_to_end_delay_matrices(self, config, packet_sizes):
+        """
+        Вычисляет сквозные задержки требований сразу для всех размеров пакета: задержки всех
+        (размер пакета, требование) суммируются одним вызовом bincount.
+        :return: (nodes, matrices): имена узлов и массив «размер пакета × источник × получатель»,
+                 nan — для пар без требования, маршрута или объёма; None, если маршруты не сохранены.
+        """
+        matrix = self.routing_matrix
+        if matrix is None:
+            return None
+        # Требования с нулевым объёмом (пустые ячейки матрицы нагрузки) не учитываются: их маршруты
+        # могут идти по каналам без нагрузки, для которых канал не подбирается
+        routed = np.flatnonzero((np.diff(matrix.indptr) > 0) & (matrix.volumes > 0))
+        flows = [self.channel_flows.get(edge, 0) for edge in matrix.edges]
+        delays = edge_delay_matrix(self.bandwidths(config, matrix.edges), flows, packet_sizes)
+        demand_count = len(matrix.demands)
+        rows = (np.arange(len(delays))[:, None] * demand_count + matrix.entry_rows).ravel()
+        demand_delays = np.bincount(rows, weights=(matrix.data * delays[:, matrix.indices]).ravel(),
+                                    minlength=len(delays) * demand_count).reshape(len(delays), demand_count)
+
+        index = {node: i for i, node in enumerate(matrix.nodes)}
+        result = np.full((len(delays), len(matrix.nodes), len(matrix.nodes)), np.nan)
+        starts = [index[matrix.demands[i][0]] for i in routed]
+        ends = [index[matrix.demands[i][1]] for i in routed]
+        result[:, starts, ends] = demand_delays[:, routed]
+        return matrix.nodes, result
+
+    def delay_profile(self, config, packet_sizes):
+        """
+        Вычисляет все задержки конфигурации для списка размеров пакета за один проход:
+        задержки каналов, задержки сети и сквозные задержки. Результат удобно кэшировать —
+        смена размера пакета сводится к выбору строки.
+        :return: DelayProfile; end_to_end равен None, если маршруты не сохранены.
+        """
+        delays = self.edge_delay_matrix(config, packet_sizes)
+        end_to_end = self.end_to_end_delay_matrices(config, packet_sizes)
+        nodes, matrices = end_to_end if end_to_end is not None else (None, None)
+        return DelayProfile(list(packet_sizes), delays, self.network_delays(config, packet_sizes, delays),
+                            nodes, matrices)
+
+
+def normalization_bounds(space, costs, delays):
+    """
+    Вычисляет минимум и максимум общей стоимости и задержки сети по всему пространству.
+    Обе величины — суммы по компонентам, поэтому границы складываются из покомпонентных min и max.
+    :return: (min_cost, max_cost, min_delay, max_delay)
+    """
+    return table_bounds(costs, delays, len(space.edges))
+
+
+def table_bounds(costs, delays, channel_count):
+    """
+    table_bounds(costs, delays, channel_count) вычисляет границы normalization_bounds по таблицам вариантов,
+    в которых задержку дают первые channel_count компонентов
+    """
+    min_cost = sum(min(options) for options in costs)
+    max_cost = sum(max(options) for options in costs)
+    min_delay = sum(min(options) for options in delays[:channel_count])
+    max_delay = sum(max(options) for options in delays[:channel_count])
+    return min_cost, max_cost, min_delay, max_delay
+
+
+def component_scores(space, costs, delays, alpha, bounds):
+    """
+    Раскладывает общий показатель (alpha * нормированная задержка + (1 - alpha) * нормированная стоимость)
+    на вклады вариантов компонентов. Общий показатель конфигурации равен сумме вкладов её вариантов
+    за вычетом константы. Варианты, при которых показатель при полном переборе не определён
+    (бесконечная задержка при конечной минимальной), получают вклад inf.
+    :return: Список списков вкладов в порядке компонентов.
+    """
+    min_cost, max_cost, min_delay, max_delay = bounds
+    channel_count = len(space.edges)
+    cost_weight = 0 if max_cost == min_cost else (1 - alpha) / (max_cost - min_cost)
+    if max_delay == min_delay:
+        delay_weight = 0
+    elif max_delay == float('inf'):
+        # Конечная задержка нормируется в 0, бесконечная даёт неопределённый показатель
+        delay_weight = None
+    else:
+        delay_weight = alpha / (max_delay - min_delay)
+
+    scores = []
+    for i, (option_costs, option_delays) in enumerate(zip(costs, delays)):
+        component = []
+        for cost, delay in zip(option_costs, option_delays):
+            if i < channel_count and delay_weight is None:
+                score = float('inf') if delay == float('inf') else cost_weight * cost
+            else:
+                score = cost_weight * cost + (delay_weight * delay if delay_weight else 0)
+            component.append(score)
+        scores.append(component)
+    return scores
+
+
+def solve_separable(space, costs, delays, alpha):
+    """
+    Находит оптимальную конфигурацию без перебора: границы нормировки вычисляются аналитически,
+    а вариант каждого компонента выбирается независимо, так как общий показатель — сумма вкладов
+    компонентов. Работает за O((E + V) * top_n) и при равенстве выбирает ту же конфигурацию,
+    что и полный перебор (первую по порядку).
+    :return: Номера вариантов компонентов или None, если пространство пусто.
+    """
+    if space.size == 0:
+        return None
+
+    bounds = normalization_bounds(space, costs, delays)
+    digits = []
+    for component in component_scores(space, costs, delays, alpha, bounds):
+        best = min(component)
+        digits.append(component.index(best))
+    return digits
+
+
+def total_score(cost, delay, bounds, alpha):
+    """
+    Вычисляет общий показатель конфигурации так же, как MainWindow.calculate_total_score:
+    нормированные в [0, 1] стоимость и задержка с весами 1 - alpha и alpha.
+    """
+    min_cost, max_cost, min_delay, max_delay = bounds
+    normalized_cost = 0 if max_cost == min_cost else (cost - min_cost) / (max_cost - min_cost)
+    normalized_delay = 0 if max_delay == min_delay else (delay - min_delay) / (max_delay - min_delay)
+    return alpha * normalized_delay + (1 - alpha) * normalized_cost
+
+
+class ParetoFrontier:
+    """
+    Парето-фронт конфигураций по общей стоимости и средней задержке.
+    Строится один раз слиянием фронтов вариантов компонентов с отсечением доминируемых точек
+    после каждого слияния, после чего выбор конфигурации для любого alpha или бюджета
+    не требует нового поиска.
+    """
+
+    def __init__(self, space, costs, delays):
+        self.space = space
+        self.bounds = normalization_bounds(space, costs, delays) if space.size else None
+
+        # Точка фронта: (стоимость, задержка сети, (предыдущая точка, номер варианта))
+        frontier = [(0, 0, None)] if space.size else []
+        for option_costs, option_delays in zip(costs, delays):
+            merged = []
+            for point in frontier:
+                cost, delay, _ = point
+                for option, (option_cost, option_delay) in enumerate(zip(option_costs, option_delays)):
+                    merged.append((cost + option_cost, delay + option_delay, (point, option)))
+            frontier = self._prune(merged)
+        self.points = frontier  # По возрастанию стоимости и убыванию задержки
+        self._costs = [cost for cost, _, _ in frontier]
+
+    @staticmethod
+    def _prune(points):
+        """Оставляет только недоминируемые точки, упорядоченные по возрастанию стоимости"""
+        points.sort(key=lambda point: (point[0], point[1]))
+        frontier = []
+        for point in points:
+            if not frontier or point[1] < frontier[-1][1]:
+                frontier.append(point)
+        return frontier
+
+    def average_delay(self, point):
+        """average_delay(point) возвращает задержку сети точки фронта"""
+        return point[1]
+
+    def digits(self, point):
+        """digits(point) восстанавливает номера вариантов компонентов для точки фронта"""
+        digits = []
+        link = point[2]
+        while link is not None:
+            point, option = link
+            digits.append(option)
+            link = point[2]
+        return digits[::-1]
+
+    def select(self, alpha):
+        """
+        select(alpha) возвращает точку фронта с минимальным общим показателем для веса задержки alpha
+        (при равенстве — более дешёвую) или None, если фронт пуст.
+        """
+        best_point = None
+        best_score = float('inf')
+        for point in self.points:
+            score = total_score(point[0], self.average_delay(point), self.bounds, alpha)
+            if score < best_score:
+                best_score = score
+                best_point = point
+        return best_point
+
+    def within_budget(self, max_cost):
+        """
+        within_budget(max_cost) возвращает точку с минимальной задержкой среди конфигураций
+        стоимостью не больше max_cost или None, если таких нет.
+        """
+        position = bisect_right(self._costs, max_cost)
+        return self.points[position - 1] if position else None
+
+
+BranchAndBoundResult = namedtuple('BranchAndBoundResult', ['digits', 'objective', 'lower_bound', 'gap', 'proven', 'nodes'])
+
+
+def branch_and_bound(scores, is_feasible=None, time_budget=None):
+    """
+    Ищет конфигурацию с минимальной суммой вкладов вариантов методом ветвей и границ.
+    Оценка снизу для частичного назначения — сумма уже выбранных вкладов плюс минимальные вклады
+    оставшихся компонентов (релаксация без ограничений), поэтому ограничения могут связывать
+    компоненты между собой.
+    :param scores: Вклады вариантов по компонентам (component_scores); inf — недопустимый вариант.
+    :param is_feasible: Проверка частичного назначения is_feasible(digits) для первых len(digits) компонентов.
+                        Должна отвергать назначение, только если его нельзя достроить до допустимого.
+    :param time_budget: Ограничение времени в секундах; None — искать до доказанного оптимума.
+    :return: BranchAndBoundResult: лучшие номера вариантов (None, если допустимых нет), их сумма вкладов,
+             доказанная оценка снизу, разрыв между ними, признак доказанной оптимальности и число узлов.
+    """
+    started = time.monotonic()
+    count = len(scores)
+
+    # Минимальные вклады оставшихся компонентов, начиная с каждого
+    suffix_min = [0] * (count + 1)
+    for i in range(count - 1, -1, -1):
+        suffix_min[i] = suffix_min[i + 1] + min(scores[i], default=float('inf'))
+
+    # Варианты каждого компонента в порядке возрастания вклада: сначала перспективные ветви
+    ordered = [sorted((score, option) for option, score in enumerate(component) if score != float('inf'))
+               for component in scores]
+
+    best_digits = None
+    best_objective = float('inf')
+    stack = [(suffix_min[0], 0, ())]  # (оценка снизу, сумма выбранных вкладов, выбранные варианты)
+    nodes = 0
+    while stack:
+        if time_budget is not None and nodes % 1024 == 0 and time.monotonic() - started > time_budget:
+            break
+        bound, prefix, digits = stack.pop()
+        nodes += 1
+        if bound >= best_objective:
+            continue
+
+        level = len(digits)
+        if level == count:
+            best_objective = prefix
+            best_digits = list(digits)
+            continue
+
+        children = []
+        for score, option in ordered[level]:
+            child_digits = digits + (option,)
+            child_prefix = prefix + score
+            child_bound = child_prefix + suffix_min[level + 1]
+            if child_bound >= best_objective:
+                break  # Дальше вклады только больше
+            if is_feasible is None or is_feasible(child_digits):
+                children.append((child_bound, child_prefix, child_digits))
+        stack.extend(reversed(children))
+
+    proven = not stack
+    lower_bound = min([best_objective] + [bound for bound, _, _ in stack])
+    gap = best_objective - lower_bound if best_digits is not None else float('inf')
+    return BranchAndBoundResult(best_digits, best_objective, lower_bound, gap, proven, nodes)
+
+
+AnnealingSolution = namedtuple('AnnealingSolution', ['digits', 'objective', 'iteration', 'elapsed'])
+
+
+def _first_feasible(ordered, is_feasible, deadline):
+    """
+    Строит первое допустимое назначение поиском в глубину, перебирая варианты в порядке возрастания вклада.
+    :return: список номеров вариантов или None, если допустимых нет или истекло время.
+    """
+    count = len(ordered)
+    stack = [()]
+    steps = 0
+    while stack:
+        steps += 1
+        if deadline is not None and steps % 1024 == 0 and time.monotonic() > deadline:
+            return None
+        digits = stack.pop()
+        if len(digits) == count:
+            return list(digits)
+        children = [digits + (option,) for option in ordered[len(digits)]
+                    if is_feasible is None or is_feasible(digits + (option,))]
+        stack.extend(reversed(children))
+    return None
+
+
+def simulated_annealing(scores, is_feasible=None, seed=None, iterations=100000, time_budget=None):
+    """
+    Ищет конфигурацию с малой суммой вкладов вариантов имитацией отжига. Шаг меняет вариант
+    одного компонента, поэтому изменение целевой функции — разность двух вкладов, а не пересчёт
+    всей конфигурации. Генератор выдаёт каждое улучшение лучшего решения, так что поиск
+    можно прервать в любой момент и взять последнее.
+    :param scores: Вклады вариантов по компонентам (component_scores); inf — недопустимый вариант.
+    :param is_feasible: Проверка частичного назначения, как в branch_and_bound. Может иметь атрибут
+                        affected(position) — номера компонентов, проверки префиксов которых зависят от варианта
+                        компонента position; тогда после шага проверяются только они, иначе все префиксы от position.
+    :param seed: Начальное значение генератора случайных чисел.
+    :param iterations: Ограничение числа шагов.
+    :param time_budget: Ограничение времени в секундах; None — без ограничения.
+    :return: генератор AnnealingSolution: номера вариантов, сумма вкладов, номер шага и затраченное время.
+    """
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget is not None else None
+    rng = random.Random(seed)
+    count = len(scores)
+    inf = float('inf')
+
+    # Допустимые варианты каждого компонента в порядке возрастания вклада
+    ordered = [[option for _, option in sorted((score, option) for option, score in enumerate(component)
+                                               if score != inf)]
+               for component in scores]
+    digits = _first_feasible(ordered, is_feasible, deadline)
+    if digits is None:
+        return
+    current = sum(scores[i][digits[i]] for i in range(count))
+    best = current
+    yield AnnealingSolution(list(digits), best, 0, time.monotonic() - started)
+
+    movable = [i for i in range(count) if len(ordered[i]) > 1]
+    if not movable:
+        return
+
+    # Какие проверки префиксов (по последнему компоненту префикса) нужно повторить после смены варианта
+    affected = getattr(is_feasible, 'affected', None)
+    checks = {position: list(affected(position)) if affected else list(range(position, count))
+              for position in movable} if is_feasible is not None else {}
+
+    # Температура убывает геометрически от среднего разброса вкладов до тысячной его доли
+    spread = sum(scores[i][ordered[i][-1]] - scores[i][ordered[i][0]] for i in movable) / len(movable)
+    initial_temperature = spread if spread > 0 else 1.0
+    cooling = 1e-3 ** (1 / iterations) if iterations else 1.0
+    temperature = initial_temperature
+
+    for iteration in range(1, iterations + 1):
+        if deadline is not None and iteration % 256 == 0 and time.monotonic() > deadline:
+            return
+        temperature *= cooling
+
+        position = rng.choice(movable)
+        old = digits[position]
+        new = rng.choice(ordered[position])
+        if new == old:
+            continue
+        delta = scores[position][new] - scores[position][old]
+        if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+            continue
+
+        digits[position] = new
+        # Изменение варианта влияет только на проверки, зависящие от этого компонента
+        if is_feasible is not None and not all(is_feasible(digits[:end + 1]) for end in checks[position]):
+            digits[position] = old
+            continue
+        current += delta
+
+        if current < best:
+            # Сумма пересчитывается заново, чтобы не накапливать ошибку округления
+            current = sum(scores[i][digits[i]] for i in range(count))
+            if current < best:
+                best = current
+                yield AnnealingSolution(list(digits), best, iteration, time.monotonic() - started)
+
+
+# Сколько памяти отводится на один блок конфигураций при пакетной оценке
+EVALUATION_MEMORY_BUDGET = 64 * 2 ** 20
+
+
+def option_arrays(costs, delays):
+    """
+    Переводит таблицы вариантов (option_tables) в массивы NumPy для пакетной оценки.
+    :return: (cost_arrays, delay_arrays) — по одному массиву на компонент.
+    """
+    return ([np.asarray(option_costs, dtype=np.int64) for option_costs in costs],
+            [np.asarray(option_delays, dtype=np.float64) for option_delays in delays])
+
+
+def index_block(space, start, stop):
+    """
+    Раскладывает номера конфигураций start..stop-1 на номера вариантов компонентов.
+    :return: матрица (stop - start) x (число компонентов).
+    """
+    indices = np.arange(start, stop, dtype=np.int64)
+    block = np.empty((len(indices), len(space.radices)), dtype=np.int64)
+    for position in range(len(space.radices) - 1, -1, -1):
+        indices, block[:, position] = np.divmod(indices, space.radices[position])
+    return block
+
+
+def evaluate_block(cost_arrays, delay_arrays, channel_count, block):
+    """
+    Оценивает блок конфигураций, заданный матрицей номеров вариантов, выборками из таблиц вариантов.
+    Слагаемые складываются по компонентам слева направо, как при поштучной оценке,
+    поэтому результаты совпадают с ней до последнего бита.
+    :param channel_count: Число первых компонентов, вклады которых входят в задержку сети.
+    :return: (total_costs, average_delays) для каждой строки блока.
+    """
+    total_costs = np.zeros(len(block), dtype=np.int64)
+    for position, option_costs in enumerate(cost_arrays):
+        total_costs += option_costs[block[:, position]]
+    average_delays = np.zeros(len(block))
+    for position in range(channel_count):
+        average_delays += delay_arrays[position][block[:, position]]
+    return total_costs, average_delays
+
+
+def block_size(space, memory_budget=EVALUATION_MEMORY_BUDGET):
+    """block_size(space, memory_budget) возвращает число конфигураций в блоке, укладывающемся в memory_budget байт"""
+    # Матрица номеров вариантов, выборка, стоимость и задержка — по 8 байт на значение
+    row_bytes = 8 * (len(space.radices) + 4)
+    return max(1, memory_budget // row_bytes)
+
+
+def evaluate_blocks(space, costs, delays, start=0, stop=None, memory_budget=EVALUATION_MEMORY_BUDGET):
+    """
+    Оценивает конфигурации пространства с номерами start..stop-1 по заранее вычисленным таблицам
+    вариантов (option_tables) блоками не больше memory_budget байт. Блоки выдаются по одному,
+    так что память не зависит от размера пространства.
+    :return: генератор троек (block_start, total_costs, average_delays) — массивы NumPy,
+             индекс i соответствует конфигурации block_start + i.
+    """
+    stop = space.size if stop is None else stop
+    cost_arrays, delay_arrays = option_arrays(costs, delays)
+    channel_count = len(space.edges)
+    step = block_size(space, memory_budget)
+    for block_start in range(start, stop, step):
+        block = index_block(space, block_start, min(block_start + step, stop))
+        yield (block_start, *evaluate_block(cost_arrays, delay_arrays, channel_count, block))
+
+
+def blocks_best(blocks, bounds, alpha):
+    """
+    Потоковый поиск минимума общего показателя по блокам при известных границах нормировки.
+    Блоки идут по возрастанию номеров, поэтому при равенстве остаётся меньший номер.
+    :return: (показатель, номер конфигурации) или None, если конечных показателей нет.
+    """
+    best = None
+    for block_start, total_costs, average_delays in blocks:
+        scores = score_block(total_costs, average_delays, bounds, alpha)
+        index = best_score_index(scores)
+        if index is not None and (best is None or scores[index] < best[0]):
+            best = (scores[index], block_start + index)
+    return best
+
+
+def score_block(total_costs, average_delays, bounds, alpha):
+    """
+    Вычисляет общий показатель (total_score) сразу для массива конфигураций.
+    Перегруженные конфигурации при бесконечной максимальной задержке получают nan, как и при поштучном расчёте.
+    """
+    min_cost, max_cost, min_delay, max_delay = bounds
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized_cost = (np.zeros(len(total_costs)) if max_cost == min_cost
+                           else (total_costs - min_cost) / (max_cost - min_cost))
+        normalized_delay = (np.zeros(len(average_delays)) if max_delay == min_delay
+                            else (average_delays - min_delay) / (max_delay - min_delay))
+        return alpha * normalized_delay + (1 - alpha) * normalized_cost
+
+
+def best_score_index(scores):
+    """
+    Возвращает индекс первой конфигурации с минимальным конечным показателем или None,
+    как при последовательном поиске со строгим сравнением.
+    """
+    if len(scores) == 0:
+        return None
+    scores = np.where(np.isnan(scores), np.inf, scores)
+    index = int(np.argmin(scores))
+    return index if scores[index] < float('inf') else None
+
+
+def prefix_shards(space, count):
+    """
+    Делит пространство на непрерывные диапазоны номеров по префиксу вариантов каналов:
+    берётся самый короткий префикс, дающий не меньше count комбинаций, и каждая комбинация
+    становится отдельным диапазоном (первые компоненты меняются медленнее всех).
+    :return: список пар (start, stop).
+    """
+    channel_count = len(space.edges)
+    prefix = 0
+    while prefix < channel_count and prod(space.radices[:prefix]) < count:
+        prefix += 1
+    step = prod(space.radices[prefix:])
+    return [(start, min(start + step, space.size)) for start in range(0, space.size, step)]
+
+
+def _shard_best(space, costs, delays, start, stop, bounds, alpha):
+    return blocks_best(evaluate_blocks(space, costs, delays, start, stop), bounds, alpha)
+
+
+_worker_tables = None
+
+
+def _init_search_worker(space, costs, delays):
+    global _worker_tables
+    _worker_tables = (space, costs, delays)
+
+
+def _shard_best_worker(task):
+    (start, stop), bounds, alpha = task
+    return _shard_best(*_worker_tables, start, stop, bounds, alpha)
+
+
+def exhaustive_search(space, costs, delays, alpha, workers=None):
+    """
+    Находит номер конфигурации с минимальным общим показателем полным перебором.
+    Границы нормировки берутся из normalization_bounds: стоимость и задержка — суммы вкладов компонентов,
+    сложение чисел с плавающей точкой монотонно, поэтому минимум и максимум по пространству побитно
+    равны сумме покомпонентных минимумов и максимумов. Каждая конфигурация оценивается один раз,
+    потоково по блокам, так что память ограничена размером блока.
+    При workers > 1 пространство делится по префиксу вариантов каналов между процессами,
+    каждый возвращает лучший показатель своей части (при равенстве — меньший номер).
+    Результат совпадает с последовательным перебором.
+    :param workers: Число процессов; None или 1 — расчёт в текущем процессе.
+    :return: номер конфигурации или None.
+    """
+    if space.size == 0:
+        return None
+    bounds = normalization_bounds(space, costs, delays)
+    shards = prefix_shards(space, workers * 4) if workers and workers > 1 else []
+    if len(shards) < 2:
+        best = blocks_best(evaluate_blocks(space, costs, delays), bounds, alpha)
+        return None if best is None else best[1]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                             initargs=(space, costs, delays)) as pool:
+        candidates = [candidate for candidate in
+                      pool.map(_shard_best_worker, [(shard, bounds, alpha) for shard in shards])
+                      if candidate is not None]
+    return min(candidates)[1] if candidates else None
+
+
+class SymmetryReduction:
+    """
+    Сжатие пространства конфигураций по симметрии. Рёбра с одинаковым потоком получают одинаковые
+    варианты каналов, а узлы с одинаковым потоком — одинаковые варианты маршрутизаторов; стоимость и
+    средняя задержка не меняются от перестановки вариантов внутри такой группы. Поэтому вместо всех
+    сочетаний перебираются мультимножества вариантов каждой группы, а конфигурация восстанавливается
+    раздачей вариантов группы её компонентам по возрастанию.
+    """
+
+    def __init__(self, space, costs, delays):
+        self.space = space
+        self.edge_count = len(space.edges)
+
+        # Компоненты взаимозаменяемы, если у них одни и те же варианты с одинаковыми задержками
+        groups = {}
+        for position, options in enumerate(space.options):
+            key = (position < self.edge_count, tuple(map(id, options)), tuple(delays[position]))
+            groups.setdefault(key, []).append(position)
+        self.groups = list(groups.values())  # Сначала группы рёбер, в порядке первого компонента
+        self.channel_groups = sum(1 for group in self.groups if group[0] < self.edge_count)
+
+        self.multisets = [list(combinations_with_replacement(range(space.radices[group[0]]), len(group)))
+                          for group in self.groups]
+        self.costs = [[sum(costs[group[0]][option] for option in multiset) for multiset in multisets]
+                      for group, multisets in zip(self.groups, self.multisets)]
+        self.delays = [[sum(delays[group[0]][option] for option in multiset) for multiset in multisets]
+                       for group, multisets in zip(self.groups, self.multisets)]
+        self.radices = [len(multisets) for multisets in self.multisets]
+        self.size = prod(self.radices)
+
+    def search(self, alpha, memory_budget=EVALUATION_MEMORY_BUDGET):
+        """
+        Находит конфигурацию с минимальным общим показателем потоковым перебором сжатого пространства.
+        Границы нормировки по сжатому пространству те же, что и по исходному.
+        :return: номера вариантов компонентов исходного пространства или None.
+        """
+        if self.size == 0:
+            return None
+        bounds = table_bounds(self.costs, self.delays, self.channel_groups)
+        cost_arrays, delay_arrays = option_arrays(self.costs, self.delays)
+        multiset_arrays = [np.array(multisets, dtype=np.int64) for multisets in self.multisets]
+        step = block_size(self, memory_budget)
+        best = None  # (показатель, номера вариантов исходного пространства)
+        for start in range(0, self.size, step):
+            block = index_block(self, start, min(start + step, self.size))
+            scores = score_block(*evaluate_block(cost_arrays, delay_arrays, self.channel_groups, block), bounds, alpha)
+            index = best_score_index(scores)
+            if index is None or (best is not None and scores[index] > best[0]):
+                continue
+
+            # Порядок сжатых номеров не совпадает с исходным, поэтому из равных берётся первая исходная
+            # конфигурация: равные строки блока раскладываются на исходные номера вариантов разом
+            # и упорядочиваются lexsort без поштучного декодирования
+            tied = block[scores == scores[index]]
+            digits = np.empty((len(tied), len(self.space.radices)), dtype=np.int64)
+            for k, group in enumerate(self.groups):
+                digits[:, group] = multiset_arrays[k][tied[:, k]]
+            first = digits[np.lexsort(digits.T[::-1])[0]].tolist() if self.groups else []
+            if best is None or scores[index] < best[0] or first < best[1]:
+                best = (scores[index], first)
+        return None if best is None else best[1]
+
+
+# Оценка для планировщика: время оценки одного компонента одной конфигурации при пакетном переборе
+EXHAUSTIVE_SECONDS_PER_COMPONENT = 5e-8
+# Пределы, в которых планировщик ещё допускает полный перебор
+EXHAUSTIVE_TIME_LIMIT = 10.0
+EXHAUSTIVE_MEMORY_LIMIT = 1024 * 2 ** 20
+# С какого числа компонентов при ограничениях метод ветвей и границ уступает эвристике
+BRANCH_AND_BOUND_MAX_COMPONENTS = 200
+
+SEARCH_ENGINES = {
+    'exhaustive': 'полный перебор',
+    'separable': 'точный покомпонентный выбор',
+    'bnb': 'метод ветвей и границ',
+    'heuristic': 'имитация отжига',
+}
+
+SearchPlan = namedtuple('SearchPlan', ['engine', 'size', 'estimated_seconds', 'estimated_bytes', 'reason'])
+
+
+def plan_search(space, constrained=False, reference=False, workers=None):
+    """
+    Выбирает метод поиска оптимальной конфигурации до начала поиска по точному размеру пространства
+    и оценкам времени и памяти полного перебора.
+    :param constrained: Есть ли ограничения, связывающие компоненты (тогда покомпонентный выбор неприменим).
+    :param reference: Нужен ли эталонный результат полного перебора, если он укладывается в пределы.
+    :param workers: Число процессов для полного перебора.
+    :return: SearchPlan: метод, число конфигураций, оценки времени (с) и памяти (байт) полного перебора, причина выбора.
+    """
+    size = space.size
+    approximate_size = float(size) if size < 10 ** 300 else math.inf  # Размер может не помещаться во float
+    estimated_seconds = approximate_size * len(space.radices) * EXHAUSTIVE_SECONDS_PER_COMPONENT / max(1, workers or 1)
+    # Перебор потоковый: каждый процесс держит в памяти один блок конфигураций
+    block_bytes = min(approximate_size, block_size(space)) * 8 * (len(space.radices) + 4)
+    estimated_bytes = block_bytes * max(1, workers or 1)
+    fits = estimated_seconds <= EXHAUSTIVE_TIME_LIMIT and estimated_bytes <= EXHAUSTIVE_MEMORY_LIMIT
+
+    if reference and not constrained and fits:
+        return SearchPlan('exhaustive', size, estimated_seconds, estimated_bytes,
+                          'запрошен эталонный результат, и полный перебор укладывается в пределы времени и памяти')
+    if not constrained:
+        reason = 'стоимость и задержка складываются по компонентам, поэтому оптимум находится без перебора'
+        if reference:
+            reason = 'полный перебор не укладывается в пределы времени и памяти, а ' + reason
+        return SearchPlan('separable', size, estimated_seconds, estimated_bytes, reason)
+    if len(space.radices) <= BRANCH_AND_BOUND_MAX_COMPONENTS:
+        return SearchPlan('bnb', size, estimated_seconds, estimated_bytes,
+                          'ограничения связывают компоненты, а их число позволяет доказывать оптимальность')
+    return SearchPlan('heuristic', size, estimated_seconds, estimated_bytes,
+                      f'ограничения связывают компоненты, а компонентов больше {BRANCH_AND_BOUND_MAX_COMPONENTS}')
+
+
+# Сколько параллельных моделей может обслуживать одно ребро
+MAX_BUNDLE_LINKS = 8
+
+
+class ComponentCatalog:
+    """
+    Индекс каталога моделей (каналов или маршрутизаторов), построенный один раз.
+    Числа из строк каталога разобраны заранее, модели упорядочены по пропускной способности,
+    так что запросы «самая дешёвая модель с пропускной способностью не меньше потока»
+    и «top_n подходящих моделей» выполняются бинарным поиском.
+    При strict=True модель выдерживает поток, только если её пропускная способность строго больше потока:
+    так для каналов, у которых при C = f задержка бесконечна.
+    """
+
+    def __init__(self, items, name_key, cost_key, bandwidth_key='Пропускная способность', strict=False):
+        self.items = items
+        self.strict = strict
+        self.name_key, self.cost_key, self.bandwidth_key = name_key, cost_key, bandwidth_key
+        self.bundles = {}  # (поток, цель, число моделей) -> подобранная связка или None
+        costs = [parse_number(item[cost_key]) for item in items]
+        bandwidths = [parse_number(item[bandwidth_key]) for item in items]
+
+        # Все модели по возрастанию пропускной способности (при равенстве — в порядке каталога)
+        order = sorted(range(len(items)), key=lambda i: (bandwidths[i], i))
+        self.bandwidths = [bandwidths[i] for i in order]
+
+        # suffix_cheapest[k] — самая дешёвая модель среди order[k:], при равной цене — первая в каталоге
+        self.suffix_cheapest = [None] * len(order)
+        best = None
+        for k in range(len(order) - 1, -1, -1):
+            i = order[k]
+            if best is None or (costs[i], i) < (costs[best], best):
+                best = i
+            self.suffix_cheapest[k] = best
+
+        # Модель с максимальной пропускной способностью (первая в каталоге при равенстве)
+        self.fastest = max(range(len(items)), key=lambda i: (bandwidths[i], -i), default=None)
+
+        # Недоминируемые модели: нет другой, которая не медленнее и не дороже.
+        # По возрастанию пропускной способности их стоимость строго растёт.
+        frontier = []
+        best_cost = float('inf')
+        for i in sorted(range(len(items)), key=lambda i: (-bandwidths[i], costs[i], i)):
+            if costs[i] < best_cost:
+                best_cost = costs[i]
+                frontier.append(i)
+        frontier.reverse()
+        self.frontier = [items[i] for i in frontier]
+        self.frontier_bandwidths = [bandwidths[i] for i in frontier]
+        self.frontier_costs = [costs[i] for i in frontier]
+
+    def cheapest(self, flow):
+        """cheapest(flow) возвращает самую дешёвую модель, выдерживающую поток flow, или None"""
+        position = self._first_fitting(self.bandwidths, flow)
+        if position == len(self.bandwidths):
+            return None
+        return self.items[self.suffix_cheapest[position]]
+
+    def fastest_for(self, flow):
+        """fastest_for(flow) возвращает модель с максимальной пропускной способностью, если она выдерживает flow"""
+        if self.fastest is None:
+            return None
+        bandwidth = self.bandwidths[-1]
+        fits = bandwidth > flow if self.strict else bandwidth >= flow
+        return self.items[self.fastest] if fits and bandwidth > 0 else None
+
+    def best(self, flow, top_n):
+        """
+        best(flow, top_n) возвращает до top_n самых дешёвых недоминируемых моделей, выдерживающих поток flow.
+        Доминируемые модели (не быстрее и не дешевле другой) не предлагаются: они не могут быть лучше.
+        """
+        position = self._first_fitting(self.frontier_bandwidths, flow)
+        return self.frontier[position:position + top_n]
+
+    def _first_fitting(self, bandwidths, flow):
+        # Номер первой модели в упорядоченном списке bandwidths, выдерживающей поток flow
+        return bisect_right(bandwidths, flow) if self.strict else bisect_left(bandwidths, flow)
+
+    def bundle(self, flow, objective='cost', max_links=MAX_BUNDLE_LINKS):
+        """
+        Подбирает связку из нескольких параллельных моделей, суммарная пропускная способность которой
+        строго больше потока flow (иначе задержка бесконечна), — для рёбер, которые не выдерживает
+        ни одна модель каталога.
+        Динамическое программирование по числу моделей в связке (не больше max_links) хранит для каждой
+        достижимой суммарной пропускной способности самую дешёвую связку. Результат запоминается
+        для (flow, objective, max_links): у многих рёбер потоки совпадают.
+        :param objective: 'cost' — минимальная стоимость, 'delay' — максимальная суммарная пропускная способность
+                          (минимальная задержка), при равенстве — дешевле.
+        :return: Запись в формате каталога с дополнительным ключом 'Состав' (список моделей) или None.
+        """
+        key = (flow, objective, max_links)
+        if key not in self.bundles:
+            self.bundles[key] = self._build_bundle(flow, objective, max_links)
+        return self.bundles[key]
+
+    def _build_bundle(self, flow, objective, max_links):
+        # Доминируемые модели связку не улучшают: их всегда можно заменить на не более медленную и не более дорогую
+        level = {0: (0, ())}  # Суммарная пропускная способность -> (стоимость, номера моделей на фронте)
+        best = None
+        for _ in range(max_links):
+            next_level = {}
+            for total, (cost, members) in level.items():
+                for i, (bandwidth, model_cost) in enumerate(zip(self.frontier_bandwidths, self.frontier_costs)):
+                    candidate = (cost + model_cost, members + (i,))
+                    if total + bandwidth not in next_level or candidate[0] < next_level[total + bandwidth][0]:
+                        next_level[total + bandwidth] = candidate
+            for total, (cost, members) in next_level.items():
+                if total <= flow:
+                    continue
+                rank = (cost, len(members)) if objective == 'cost' else (-total, cost, len(members))
+                if best is None or rank < best[0]:
+                    best = (rank, total, cost, members)
+            level = next_level
+        if best is None:
+            return None
+
+        _, total, cost, members = best
+        # Единицы измерения берутся из записей каталога
+        models = [self.frontier[i] for i in sorted(members, reverse=True)]
+        counts = {}
+        for model in models:
+            counts[model[self.name_key]] = counts.get(model[self.name_key], 0) + 1
+        return {
+            self.name_key: ' + '.join(name if count == 1 else f"{count} × {name}" for name, count in counts.items()),
+            self.bandwidth_key: f"{total} {self.frontier[0][self.bandwidth_key].split(maxsplit=1)[1]}",
+            self.cost_key: f"{cost} {self.frontier[0][self.cost_key].split(maxsplit=1)[1]}",
+            'Состав': models,
+        }
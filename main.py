@@ -1,11 +1,15 @@
+import os
 import sys
 import time
 import json
 
 import networkx as nx
-from PyQt6 import QtWidgets
-from PyQt6.QtWidgets import QVBoxLayout, QLabel, QComboBox, QTableWidget, QTabWidget, QWidget, QTableWidgetItem
+import numpy as np
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtWidgets import QVBoxLayout, QLabel, QComboBox, QTableWidget, QTabWidget, QWidget, QTableWidgetItem, \
+    QSlider, QSpinBox
 
+import configurations
 import graph_class
 import utils
 from configuration_viewer import ConfigurationViewer
@@ -15,6 +19,9 @@ from main_window import Ui_MainWindow
 
 
 class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
+    PARALLEL_ROUTING_MIN_NODES = 300  # С какого числа узлов маршрутизация идёт в пуле процессов
+    PARALLEL_SEARCH_MIN_CONFIGURATIONS = 2_000_000  # С какого размера пространства полный перебор идёт в пуле процессов
+
     def __init__(self, parent=None):
         super(MainWindow, self).__init__(parent)
         self.setupUi(self)
@@ -50,6 +57,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
              'Стоимость аренды': '20000 рублей/месяц'},  # Новый канал
         ]
         utils.setup_table(self.tableChannels, self.chs)
+        # Индексы каталогов: подбор модели под поток — бинарный поиск вместо перебора строк
+        self.channel_catalog = configurations.ComponentCatalog(self.chs, 'Канал', 'Стоимость аренды', strict=True)
+        self.router_catalog = configurations.ComponentCatalog(self.rs, 'Модель', 'Стоимость')
         self.pkgs = [
             {'Размер пакета': '16 бит'},
             {'Размер пакета': '64 бит'},
@@ -58,6 +68,21 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         ]
         utils.setup_table(self.tablePackages, self.pkgs)
 
+        # Выбор алгоритма маршрутизации
+        self.routing_mode = 'greedy'
+        self.flow_state = None
+        self.routing_matrix = None
+        self.delay_model = None
+        self.channel_flows = {}
+        self.pareto_frontier = None
+        self.optimal_config_error = None  # Почему оптимальная конфигурация не найдена
+        for mode, title in utils.ROUTING_MODES.items():
+            self.routingCombo.addItem(title, mode)
+        self.routingCombo.currentIndexChanged.connect(self.change_routing_mode)
+
+        # Ограничение на оптимальную конфигурацию: с ним поиск идёт методом ветвей и границ или отжигом
+        self.routerConstraintCheck.toggled.connect(self.change_routing_mode)
+
         self.clearButton.clicked.connect(self.clear)
         self.inputButton.clicked.connect(self.open_input)
         self.editButton.clicked.connect(self.open_edit)
@@ -65,6 +90,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.action_save.triggered.connect(self.save_file)
         self.action_open.triggered.connect(self.open_file)
 
+    def change_routing_mode(self):
+        """
+        Переключает алгоритм маршрутизации или ограничение на конфигурацию
+        и перестраивает граф, если данные уже введены.
+        """
+        self.routing_mode = self.routingCombo.currentData()
+        if self.ps:
+            self.show_graph()
+
     def open_configurations(self):
         """
         Открывает окно с конфигурациями.
@@ -73,6 +107,9 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                                                                                                         'optimal_config'):
             utils.error("Конфигурации не рассчитаны. Сначала постройте граф.")
             return
+        if self.optimal_config is None:
+            utils.error(f"{self.optimal_config_error}.")
+            return
 
         # Открываем окно с конфигурациями
         self.show_configurations(self.min_cost_config, self.min_delay_config, self.optimal_config)
@@ -101,6 +138,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.setup_config_tab(tab_min_cost, config_min_cost)
         self.setup_config_tab(tab_min_delay, config_min_delay)
         self.setup_config_tab(tab_optimal, config_optimal)
+        self.setup_tradeoff_controls(tab_optimal)
 
         # Основной layout
         layout = QVBoxLayout()
@@ -122,8 +160,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         for pkg in self.pkgs:
             packet_size_combo.addItem(pkg['Размер пакета'])
         packet_size_combo.currentIndexChanged.connect(
-            lambda: self.update_config_tab(tab, config, packet_size_combo.currentText())
+            lambda: self.update_delay_info(tab, tab.config, packet_size_combo.currentIndex())
         )
+        tab.config = config
+        tab.packet_size_combo = packet_size_combo
+        tab.delay_profile = None  # (config, delay_model, DelayProfile) — задержки для всех размеров пакета
 
         # Таблица с каналами и маршрутизаторами
         table = QTableWidget()
@@ -144,6 +185,50 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         tab.setLayout(layout)
         self.update_config_tab(tab, config, self.pkgs[0]['Размер пакета'])
 
+    def setup_tradeoff_controls(self, tab):
+        """
+        Добавляет на вкладку оптимальной конфигурации выбор компромисса между стоимостью и задержкой:
+        вес задержки alpha и ограничение бюджета. Ответ берётся из заранее построенного Парето-фронта.
+        """
+        frontier = self.pareto_frontier
+        if frontier is None or not frontier.points:
+            return
+
+        alpha_label = QLabel("Вес задержки (alpha): 0.50")
+        alpha_slider = QSlider(QtCore.Qt.Orientation.Horizontal)
+        alpha_slider.setRange(0, 100)
+        alpha_slider.setValue(50)
+
+        budget_label = QLabel("Бюджет (рублей/месяц):")
+        budget_spin = QSpinBox()
+        budget_spin.setRange(0, frontier.points[-1][0])
+        budget_spin.setSingleStep(500)
+        budget_spin.setSpecialValueText("без ограничения")
+
+        def select_configuration():
+            alpha = alpha_slider.value() / 100
+            alpha_label.setText(f"Вес задержки (alpha): {alpha:.2f}")
+            if budget_spin.value() > 0:
+                point = frontier.within_budget(budget_spin.value())
+                if point is None:
+                    budget_label.setText("Бюджет (рублей/месяц): нет конфигураций в пределах бюджета")
+                    return
+            else:
+                point = frontier.select(alpha)
+            budget_label.setText("Бюджет (рублей/месяц):")
+
+            self.optimal_config = self.configuration_from_digits(frontier.space, frontier.digits(point),
+                                                                 self.channel_flows, packet_size=16)
+            tab.config = self.optimal_config
+            self.update_config_tab(tab, tab.config, tab.packet_size_combo.currentText())
+
+        alpha_slider.valueChanged.connect(select_configuration)
+        budget_spin.valueChanged.connect(select_configuration)
+
+        layout = tab.layout()
+        for position, widget in enumerate((alpha_label, alpha_slider, budget_label, budget_spin)):
+            layout.insertWidget(position, widget)
+
     def update_config_tab(self, tab, config, packet_size_str):
         """
         Обновляет информацию на вкладке.
@@ -191,21 +276,52 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         graph_widget = tab.findChild(graph_class.GraphWidget)
         self.update_config_graph(graph_widget, config)
 
-        # Вычисляем задержку
-        delay = self.calculate_config_delay(config, packet_size)
+        # Обновляем информацию о задержке и стоимости
+        self.update_delay_info(tab, config, self.packet_sizes().index(packet_size))
+
+    def config_delay_profile(self, tab, config):
+        """
+        Возвращает задержки конфигурации для всех размеров пакета (DelayProfile).
+        Профиль вычисляется один раз и хранится на вкладке, пока не сменятся конфигурация или потоки,
+        поэтому переключение размера пакета ничего не пересчитывает.
+        """
+        if self.delay_model is None:
+            return None
+        cached = tab.delay_profile
+        if cached is None or cached[0] is not config or cached[1] is not self.delay_model:
+            profile = self.delay_model.delay_profile(config, self.packet_sizes())
+            tab.delay_profile = cached = (config, self.delay_model, profile)
+        return cached[2]
+
+    def update_delay_info(self, tab, config, packet_index):
+        """
+        Обновляет на вкладке задержку и стоимость конфигурации для размера пакета с номером packet_index.
+        """
+        profile = self.config_delay_profile(tab, config)
+
+        # Задержка сети и наибольшая сквозная задержка между узлами берутся из профиля
+        delay = profile.network_delays[packet_index] if profile else 0
+        end_to_end = None
+        if profile and profile.end_to_end is not None:
+            end_to_end = profile.nodes, profile.end_to_end[packet_index]
 
         # Вычисляем стоимость внедрения и обслуживания
         implementation_cost = self.calculate_implementation_cost(config)
         maintenance_cost = self.calculate_maintenance_cost(config)
 
-        # Обновляем информацию о задержке и стоимости
         info_label = tab.findChild(QLabel, "info_label")
         if not info_label:
             info_label = QLabel()
             info_label.setObjectName("info_label")
             tab.layout().addWidget(info_label)
+        info = f"Средняя задержка: {delay:.6f} секунд\n"
+        if end_to_end is not None and not np.all(np.isnan(end_to_end[1])):
+            nodes, matrix = end_to_end
+            start, end = np.unravel_index(np.nanargmax(matrix), matrix.shape)
+            info += (f"Наибольшая сквозная задержка: {nodes[start]} → {nodes[end]}, "
+                     f"{matrix[start, end]:.6f} секунд\n")
         info_label.setText(
-            f"Средняя задержка: {delay:.6f} секунд\n"
+            info +
             f"Стоимость внедрения: {implementation_cost} рублей\n"
             f"Стоимость обслуживания: {maintenance_cost} рублей/месяц"
         )
@@ -245,19 +361,20 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
     def calculate_config_delay(self, config, packet_size):
         """
-        Вычисляет задержку для конфигурации.
+        Вычисляет задержку сети для конфигурации по текущим потокам (DelayModel).
         """
-        total_delay = 0
-        if 'channels' in config and isinstance(config['channels'], dict):
-            for edge, channel in config['channels'].items():
-                if isinstance(channel, dict):  # Проверяем, что channel — это словарь
-                    bandwidth = int(channel.get('Пропускная способность', '0').split()[0])
-                    flow = 0  # Здесь нужно получить поток для ребра (пока заглушка)
-                    if bandwidth > flow:
-                        total_delay += packet_size / (bandwidth - flow)
-        return total_delay / len(config['channels']) if config.get('channels') else 0
+        return self.delay_model.network_delay(config, packet_size) if self.delay_model else 0
 
-    def show_graph(self):
+    def total_traffic(self):
+        """
+        Возвращает суммарный объём требований матрицы нагрузки или None, если матрица пуста.
+        """
+        return sum(load['Объём информации(в Бит/c)'] for load in self.loads) or None
+
+    def build_graph(self):
+        """
+        Строит граф сети по таблице узлов и матрице каналов.
+        """
         G = nx.Graph()
 
         # Добавляем узлы
@@ -266,49 +383,174 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             G.add_node(name)
 
         # Добавляем рёбра только для каналов с наличием связи
+        lengths = {}
         for channel in self.channels:
             if channel['Связь'] == 1:
                 G.add_edge(channel['Из узла'], channel['В узел'])
+                if 'Длина' in channel:
+                    lengths[tuple(sorted([channel['Из узла'], channel['В узел']]))] = channel['Длина']
+
+        # Длина канала: заданная пользователем или расстояние между узлами по координатам
+        utils.set_link_lengths(G, self.ps, lengths)
 
-        # Рассчитываем потоки для каналов
-        channel_flows = utils.calculate_channel_flows(G, self.loads)
+        return G
+
+    def show_graph(self):
+        G = self.build_graph()
+
+        # Рассчитываем потоки для каналов выбранным алгоритмом маршрутизации
+        if self.routing_mode in ('greedy', 'distance', 'feedback'):
+            # Сохраняем маршруты, чтобы после редактирования пересчитывать только изменившиеся требования
+            weight = 'weight' if self.routing_mode == 'distance' else None
+            self.flow_state = utils.FlowState(G, self.loads, weight)
+            if self.routing_mode == 'feedback':
+                self.flow_state.reroute_overloaded(self.channel_catalog.bandwidths[-1])
+            channel_flows = self.flow_state.channel_flows
+            self.routing_matrix = self.flow_state.routing_matrix()
+        elif self.routing_mode in ('max_load', 'delay'):
+            # Маршруты балансировки сохраняются для расчёта сквозных задержек
+            self.flow_state = None
+            self.routing_matrix = utils.build_balanced_routing_matrix(
+                G, self.loads, self.routing_mode, capacity=self.channel_catalog.bandwidths[-1])
+            channel_flows = self.routing_matrix.channel_flows()
+        else:
+            self.flow_state = None
+            self.routing_matrix = None
+            max_bandwidth = self.channel_catalog.bandwidths[-1]
+            # На больших сетях маршрутизация по источникам распределяется по процессам
+            workers = os.cpu_count() if G.number_of_nodes() >= self.PARALLEL_ROUTING_MIN_NODES else None
+            channel_flows = utils.route_demands(G, self.loads, self.routing_mode, capacity=max_bandwidth,
+                                                workers=workers)
 
         # Рассчитываем потоки для узлов
         node_flows = utils.calculate_node_flows(G, channel_flows)
+        self.delay_model = configurations.DelayModel(channel_flows, self.total_traffic(), self.routing_matrix)
 
         # Конфигурация с минимальной задержкой
         self.min_delay_config = self.find_min_delay_configuration(channel_flows, node_flows)
-        print("Конфигурация с минимальной задержкой:")
-        print(f"Каналы: {self.min_delay_config['channels']}")
-        print(f"Маршрутизаторы: {self.min_delay_config['routers']}")
-        if self.min_delay_config['average_delay'] == float('inf'):
-            print("Средняя задержка: Канал перегружен")
-        else:
-            print(f"Средняя задержка: {self.min_delay_config['average_delay']:.6f} секунд")
-        print(f"Общая стоимость: {self.min_delay_config['total_cost']} рублей/месяц")
 
         # Конфигурация с минимальной стоимостью
         self.min_cost_config = self.find_min_cost_configuration(channel_flows, node_flows)
-        print("\nКонфигурация с минимальной стоимостью:")
-        print(f"Каналы: {self.min_cost_config['channels']}")
-        print(f"Маршрутизаторы: {self.min_cost_config['routers']}")
-        if self.min_cost_config['average_delay'] == float('inf'):
-            print("Средняя задержка: Канал перегружен")
-        else:
-            print(f"Средняя задержка: {self.min_cost_config['average_delay']:.6f} секунд")
-        print(f"Общая стоимость: {self.min_cost_config['total_cost']} рублей/месяц")
-
-        # Оптимальная конфигурация
-        self.optimal_config = self.find_optimal_configuration(channel_flows, node_flows, packet_size=16, alpha=0.5)
-        print("\nОптимальная конфигурация:")
-        print(f"Каналы: {self.optimal_config['channels']}")
-        print(f"Маршрутизаторы: {self.optimal_config['routers']}")
-        if self.optimal_config['average_delay'] == float('inf'):
-            print("Средняя задержка: Канал перегружен")
-        else:
-            print(f"Средняя задержка: {self.optimal_config['average_delay']:.6f} секунд")
-        print(f"Общая стоимость: {self.optimal_config['total_cost']} рублей/месяц")
 
+        # Оптимальная конфигурация и Парето-фронт для выбора другого компромисса
+        self.update_optimal_configuration(channel_flows, node_flows)
+
+        self.print_configurations()
+        self.plot_flows(G, channel_flows, node_flows)
+
+    def update_graph(self):
+        """
+        Пересчитывает потоки после изменения матрицы нагрузки.
+        Если топология не изменилась, перекладываются только изменившиеся требования,
+        а компоненты подбираются заново только для рёбер и узлов с изменившимся потоком.
+        """
+        G = self.build_graph()
+        if self.flow_state is None or not self.flow_state.matches(G):
+            self.show_graph()
+            return
+
+        changed_edges, changed_nodes = self.flow_state.update(self.loads)
+        if self.routing_mode == 'feedback':
+            # Новые требования могли перегрузить каналы: перекладываем их, пока все каналы не уложатся в каталог
+            rerouted_edges, rerouted_nodes = self.flow_state.reroute_overloaded(self.channel_catalog.bandwidths[-1])
+            changed_edges |= rerouted_edges
+            changed_nodes |= rerouted_nodes
+        channel_flows, node_flows = self.flow_state.channel_flows, self.flow_state.node_flows
+        self.routing_matrix = self.flow_state.routing_matrix()
+        self.delay_model = configurations.DelayModel(channel_flows, self.total_traffic(), self.routing_matrix)
+        self.update_configurations(channel_flows, node_flows, changed_edges, changed_nodes)
+
+        self.print_configurations()
+        self.plot_flows(G, channel_flows, node_flows)
+
+    def update_configurations(self, channel_flows, node_flows, changed_edges, changed_nodes):
+        """
+        Обновляет рассчитанные конфигурации только для рёбер и узлов с изменившимся потоком.
+        """
+        selections = (
+            (self.min_cost_config, self.select_min_cost_channel, self.select_min_cost_router),
+            (self.min_delay_config, self.select_max_bandwidth_channel, self.select_max_bandwidth_router),
+        )
+        for config, select_channel, select_router in selections:
+            for edge in changed_edges:
+                flow = channel_flows.get(edge, 0)
+                channel = select_channel(flow) if flow > 0 else None
+                if channel:
+                    config['channels'][edge] = channel
+                else:
+                    config['channels'].pop(edge, None)
+
+            for node in changed_nodes:
+                flow = node_flows.get(node, 0)
+                router = select_router(flow) if flow > 0 else None
+                if router:
+                    config['routers'][node] = router
+                else:
+                    config['routers'].pop(node, None)
+
+            self.update_configuration_totals(config, channel_flows)
+
+        # Оптимальная конфигурация зависит от границ нормировки по всей сети, поэтому пересчитываем её целиком
+        self.update_optimal_configuration(channel_flows, node_flows)
+
+    def update_optimal_configuration(self, channel_flows, node_flows):
+        """
+        Находит оптимальную конфигурацию с учётом выбранного ограничения и строит Парето-фронт.
+        Фронт не учитывает ограничение, поэтому при включённом ограничении выбор компромисса недоступен.
+        """
+        self.channel_flows = channel_flows
+        constraint = self.make_router_capacity_constraint if self.routerConstraintCheck.isChecked() else None
+        self.optimal_config = self.find_optimal_configuration_auto(channel_flows, node_flows, packet_size=16,
+                                                                   alpha=0.5, constraint=constraint)
+        self.optimal_config_error = None
+        if self.optimal_config is None:
+            self.optimal_config_error = self.explain_missing_configuration(channel_flows, node_flows,
+                                                                           constraint is not None)
+        self.pareto_frontier = None
+        if constraint is None:
+            self.pareto_frontier = self.build_pareto_frontier(channel_flows, node_flows, packet_size=16)
+
+    def explain_missing_configuration(self, channel_flows, node_flows, constrained):
+        """
+        Объясняет, почему оптимальная конфигурация не найдена: называет каналы и узлы, для потока
+        которых в каталоге нет подходящей модели, иначе — ограничение на маршрутизаторы, если оно включено.
+        """
+        missing = [f"канал {edge[0]} - {edge[1]} ({flow:.2f} бит/с)" for edge, flow in channel_flows.items()
+                   if flow > 0 and not self.get_best_channels(flow, 1)]
+        missing += [f"узел {node} ({flow:.2f} бит/с)" for node, flow in node_flows.items()
+                    if flow > 0 and not self.get_best_routers(flow, 1)]
+        if missing:
+            return "Нет подходящих моделей для: " + ", ".join(missing)
+        if constrained:
+            return "Нет конфигураций, удовлетворяющих ограничению на маршрутизаторы"
+        return "Нет конфигураций без перегруженных каналов"
+
+    def print_configurations(self):
+        """
+        Выводит рассчитанные конфигурации в консоль.
+        """
+        configurations = (
+            ("Конфигурация с минимальной задержкой:", self.min_delay_config),
+            ("\nКонфигурация с минимальной стоимостью:", self.min_cost_config),
+            ("\nОптимальная конфигурация:", self.optimal_config),
+        )
+        for title, config in configurations:
+            print(title)
+            if config is None:
+                print(self.optimal_config_error)
+                continue
+            print(f"Каналы: {config['channels']}")
+            print(f"Маршрутизаторы: {config['routers']}")
+            if config['average_delay'] == float('inf'):
+                print("Средняя задержка: Канал перегружен")
+            else:
+                print(f"Средняя задержка: {config['average_delay']:.6f} секунд")
+            print(f"Общая стоимость: {config['total_cost']} рублей/месяц")
+
+    def plot_flows(self, G, channel_flows, node_flows):
+        """
+        Отрисовывает граф сети с потоками на рёбрах и узлах.
+        """
         # Преобразуем потоки в формат для отображения
         edge_labels = {edge: f"{flow:.2f} бит/с" for edge, flow in channel_flows.items()}
 
@@ -337,7 +579,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.channels = self.edit_dialog.channels
             self.edit_dialog.clear()
             self.put_info(self.ps, self.loads)
-            self.show_graph()
+            self.update_graph()
 
     def open_input(self):
         self.dialog.exec()
@@ -408,6 +650,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                     'В узел': channel['В узел'],
                     'Связь': channel['Связь']
                 }
+                if 'Длина' in channel:
+                    tmp['Длина'] = channel['Длина']
                 to_save['channels'].append(tmp)
 
             # Сохраняем в файл
@@ -468,6 +712,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                         'В узел': channel['В узел'],
                         'Связь': channel['Связь']
                     }
+                    if 'Длина' in channel:
+                        tmp['Длина'] = channel['Длина']
                     self.channels.append(tmp)
 
             # Обновляем интерфейс
@@ -483,18 +729,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         :param flow: Текущий поток через ребро (в бит/с).
         :return: Название подходящего канала или None, если подходящий канал не найден.
         """
-        suitable_channels = []
-        for channel in self.chs:
-            bandwidth = int(
-                channel['Пропускная способность'].split()[0])  # Извлекаем числовое значение пропускной способности
-            if bandwidth >= flow:
-                cost = int(channel['Стоимость аренды'].split()[0])  # Извлекаем числовое значение стоимости
-                suitable_channels.append((channel['Канал'], cost))
-
-        if suitable_channels:
-            # Выбираем канал с минимальной ценой
-            return min(suitable_channels, key=lambda x: x[1])[0]
-        return None  # Если подходящий канал не найден
+        channel = self.select_min_cost_channel(flow)
+        return channel['Канал'] if channel else None
 
     def print_channel_selection(self, channel_flows):
         """
@@ -516,18 +752,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         :param flow: Суммарный поток через узел (в бит/с).
         :return: Название подходящего маршрутизатора или None, если подходящий маршрутизатор не найден.
         """
-        suitable_routers = []
-        for router in self.rs:
-            bandwidth = int(
-                router['Пропускная способность'].split()[0])  # Извлекаем числовое значение пропускной способности
-            if bandwidth >= flow:
-                cost = int(router['Стоимость'].split()[0])  # Извлекаем числовое значение стоимости
-                suitable_routers.append((router['Модель'], cost))
-
-        if suitable_routers:
-            # Выбираем маршрутизатор с минимальной ценой
-            return min(suitable_routers, key=lambda x: x[1])[0]
-        return None  # Если подходящий маршрутизатор не найден
+        router = self.router_catalog.cheapest(flow)
+        return router['Модель'] if router else None
 
     def print_router_selection(self, node_flows):
         """
@@ -542,55 +768,23 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 else:
                     print(f"{node} - Подходящий маршрутизатор не найден")
 
-    def calculate_edge_delays(self, channel_flows, selected_channels, packet_size):
+    def packet_sizes(self):
         """
-        Вычисляет задержку для каждого ребра с ненулевой нагрузкой.
-        :param channel_flows: Словарь с потоками для каждого ребра.
-        :param selected_channels: Словарь с выбранными каналами для каждого ребра.
-        :param packet_size: Размер пакета (в битах).
-        :return: Словарь с задержками для каждого ребра.
+        Возвращает размеры пакетов из таблицы пакетов (в битах) в порядке таблицы.
         """
-        edge_delays = {}
-        for edge, flow in channel_flows.items():
-            if flow > 0:  # Только для рёбер с ненулевой нагрузкой
-                if edge in selected_channels:
-                    bandwidth = 0
-                    channel_name = selected_channels[edge]
-                    # Находим пропускную способность выбранного канала
-                    for channel in self.chs:
-                        if channel['Канал'] == channel_name:
-                            bandwidth = int(channel['Пропускная способность'].split()[0])  # Переводим в бит/с
-                            break
-                    # Проверяем, что поток не превышает пропускную способность
-                    if bandwidth > flow:
-                        delay = packet_size / (bandwidth - flow)
-                        edge_delays[edge] = delay
-                    else:
-                        edge_delays[edge] = float('inf')  # Задержка бесконечна, если канал перегружен
-        return edge_delays
-
-    def calculate_average_delay(self, edge_delays):
-        """
-        Вычисляет среднюю задержку по сети.
-        :param edge_delays: Словарь с задержками для каждого ребра.
-        :return: Средняя задержка.
-        """
-        if not edge_delays:
-            return 0  # Если рёбер с ненулевой нагрузкой нет, задержка равна 0
-
-        total_delay = sum(edge_delays.values())
-        return total_delay / len(edge_delays)
-
-    def print_packet_delays(self, channel_flows):
-        """
-        Выводит среднюю задержку для каждого размера пакета.
-        :param channel_flows: Словарь с потоками для каждого ребра.
+        return [int(pkg['Размер пакета'].split()[0]) for pkg in self.pkgs]
+
+    def print_packet_delays(self, config):
         """
-        for pkg in self.pkgs:
-            packet_size = int(pkg['Размер пакета'].split()[0])  # Извлекаем размер пакета (в битах)
-            edge_delays = self.calculate_edge_delays(channel_flows, packet_size)
-            average_delay = self.calculate_average_delay(edge_delays)
-            print(f"{pkg['Размер пакета']} - {average_delay:.6f} секунд")
+        Выводит задержку сети конфигурации для каждого размера пакета.
+        Задержки для всех размеров вычисляются одним проходом (DelayModel.network_delays).
+        :param config: Конфигурация сети.
+        """
+        if self.delay_model is None:
+            return
+        delays = self.delay_model.network_delays(config, self.packet_sizes())
+        for pkg, delay in zip(self.pkgs, delays):
+            print(f"{pkg['Размер пакета']} - {delay:.6f} секунд")
 
     def calculate_implementation_cost(self, config):
         """
@@ -629,57 +823,51 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         return maintenance_cost
 
-    def find_min_delay_configuration(self, channel_flows, node_flows):
+    def select_max_bandwidth_channel(self, flow):
         """
-        Выбирает каналы и маршрутизаторы с минимальной задержкой.
+        Возвращает канал с максимальной пропускной способностью, выдерживающий поток flow
+        (пропускная способность строго больше потока), или None.
+        Если ни один канал не выдерживает поток, возвращается связка параллельных каналов с минимальной задержкой.
         """
-        config = {
-            'channels': {},
-            'routers': {},
-            'average_delay': 0,
-            'total_cost': 0
-        }
+        return self.channel_catalog.fastest_for(flow) or self.channel_catalog.bundle(flow, 'delay')
 
-        # Выбираем каналы с максимальной пропускной способностью
-        for edge, flow in channel_flows.items():
-            if flow > 0:
-                # Выбираем канал с максимальной пропускной способностью
-                max_bandwidth = 0
-                selected_channel = None
-                for channel in self.chs:
-                    bandwidth = int(channel['Пропускная способность'].split()[0])  # Переводим в бит/с
-                    if bandwidth >= flow and bandwidth > max_bandwidth:
-                        max_bandwidth = bandwidth
-                        selected_channel = channel
-                if selected_channel:
-                    config['channels'][edge] = selected_channel
-                    config['total_cost'] += int(selected_channel['Стоимость аренды'].split()[0])
+    def select_max_bandwidth_router(self, flow):
+        """
+        Возвращает маршрутизатор с максимальной пропускной способностью, выдерживающий поток flow, или None.
+        """
+        return self.router_catalog.fastest_for(flow)
 
-        # Выбираем маршрутизаторы с максимальной пропускной способностью
-        for node, flow in node_flows.items():
-            if flow > 0:
-                # Выбираем маршрутизатор с максимальной пропускной способностью
-                max_bandwidth = 0
-                selected_router = None
-                for router in self.rs:
-                    bandwidth = int(router['Пропускная способность'].split()[0])  # Переводим в бит/с
-                    if bandwidth >= flow and bandwidth > max_bandwidth:
-                        max_bandwidth = bandwidth
-                        selected_router = router
-                if selected_router:
-                    config['routers'][node] = selected_router
-                    config['total_cost'] += int(selected_router['Стоимость'].split()[0])
+    def select_min_cost_channel(self, flow):
+        """
+        Возвращает самый дешёвый канал, выдерживающий поток flow
+        (пропускная способность строго больше потока), или None.
+        Если ни один канал не выдерживает поток, возвращается самая дешёвая связка параллельных каналов.
+        """
+        return self.channel_catalog.cheapest(flow) or self.channel_catalog.bundle(flow, 'cost')
 
-        # Вычисляем среднюю задержку
-        packet_size = int(self.pkgs[0]['Размер пакета'].split()[0])  # Используем первый пакет для расчёта задержки
-        edge_delays = self.calculate_edge_delays(channel_flows, config['channels'], packet_size)
-        config['average_delay'] = self.calculate_average_delay(edge_delays)
+    def select_min_cost_router(self, flow):
+        """
+        Возвращает самый дешёвый маршрутизатор, выдерживающий поток flow, или None.
+        """
+        return self.router_catalog.cheapest(flow)
 
-        return config
+    def update_configuration_totals(self, config, channel_flows):
+        """
+        Пересчитывает общую стоимость и среднюю задержку конфигурации.
+        """
+        config['total_cost'] = (
+                sum(int(channel['Стоимость аренды'].split()[0]) for channel in config['channels'].values())
+                + sum(int(router['Стоимость'].split()[0]) for router in config['routers'].values())
+        )
 
-    def find_min_cost_configuration(self, channel_flows, node_flows):
+        # Вычисляем задержку сети
+        packet_size = int(self.pkgs[0]['Размер пакета'].split()[0])  # Используем первый пакет для расчёта задержки
+        delay_model = configurations.DelayModel(channel_flows, self.total_traffic())
+        config['average_delay'] = delay_model.network_delay(config, packet_size)
+
+    def build_configuration(self, channel_flows, node_flows, select_channel, select_router):
         """
-        Выбирает каналы и маршрутизаторы с минимальной стоимостью.
+        Собирает конфигурацию, подбирая каждому нагруженному ребру и узлу компонент функциями выбора.
         """
         config = {
             'channels': {},
@@ -688,74 +876,58 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             'total_cost': 0
         }
 
-        # Выбираем каналы с минимальной стоимостью
         for edge, flow in channel_flows.items():
             if flow > 0:
-                # Выбираем канал с минимальной стоимостью
-                min_cost = float('inf')
-                selected_channel = None
-                for channel in self.chs:
-                    bandwidth = int(channel['Пропускная способность'].split()[0])  # Переводим в бит/с
-                    cost = int(channel['Стоимость аренды'].split()[0])
-                    if bandwidth >= flow and cost < min_cost:
-                        min_cost = cost
-                        selected_channel = channel
+                selected_channel = select_channel(flow)
                 if selected_channel:
                     config['channels'][edge] = selected_channel
-                    config['total_cost'] += min_cost
 
-        # Выбираем маршрутизаторы с минимальной стоимостью
         for node, flow in node_flows.items():
             if flow > 0:
-                # Выбираем маршрутизатор с минимальной стоимостью
-                min_cost = float('inf')
-                selected_router = None
-                for router in self.rs:
-                    bandwidth = int(router['Пропускная способность'].split()[0])  # Переводим в бит/с
-                    cost = int(router['Стоимость'].split()[0])
-                    if bandwidth >= flow and cost < min_cost:
-                        min_cost = cost
-                        selected_router = router
+                selected_router = select_router(flow)
                 if selected_router:
                     config['routers'][node] = selected_router
-                    config['total_cost'] += min_cost
-
-        # Вычисляем среднюю задержку
-        packet_size = int(self.pkgs[0]['Размер пакета'].split()[0])  # Используем первый пакет для расчёта задержки
-        edge_delays = self.calculate_edge_delays(channel_flows, config['channels'], packet_size)
-        config['average_delay'] = self.calculate_average_delay(edge_delays)
 
+        self.update_configuration_totals(config, channel_flows)
         return config
 
+    def find_min_delay_configuration(self, channel_flows, node_flows):
+        """
+        Выбирает каналы и маршрутизаторы с минимальной задержкой (с максимальной пропускной способностью).
+        """
+        return self.build_configuration(channel_flows, node_flows,
+                                        self.select_max_bandwidth_channel, self.select_max_bandwidth_router)
+
+    def find_min_cost_configuration(self, channel_flows, node_flows):
+        """
+        Выбирает каналы и маршрутизаторы с минимальной стоимостью.
+        """
+        return self.build_configuration(channel_flows, node_flows,
+                                        self.select_min_cost_channel, self.select_min_cost_router)
+
     def get_best_channels(self, flow, top_n=3):
         """
         Возвращает top_n каналов с наименьшей стоимостью для заданного потока.
+        Каналы, которые не быстрее и не дешевле другого канала каталога, не предлагаются.
+        Если ни один канал не выдерживает поток, предлагаются связки параллельных каналов:
+        самая дешёвая и с минимальной задержкой.
         """
-        suitable_channels = []
-        for channel in self.chs:
-            bandwidth = int(channel['Пропускная способность'].split()[0])
-            if bandwidth >= flow:
-                cost = int(channel['Стоимость аренды'].split()[0])
-                suitable_channels.append((channel, cost))
-
-        # Сортируем по стоимости и выбираем top_n
-        suitable_channels.sort(key=lambda x: x[1])
-        return [x[0] for x in suitable_channels[:top_n]]
+        channels = self.channel_catalog.best(flow, top_n)
+        if channels:
+            return channels
+        bundles = []
+        for objective in ('cost', 'delay'):
+            bundle = self.channel_catalog.bundle(flow, objective)
+            if bundle is not None and bundle not in bundles:
+                bundles.append(bundle)
+        return bundles[:top_n]
 
     def get_best_routers(self, flow, top_n=3):
         """
         Возвращает top_n маршрутизаторов с наименьшей стоимостью для заданного потока.
+        Маршрутизаторы, которые не быстрее и не дешевле другого маршрутизатора каталога, не предлагаются.
         """
-        suitable_routers = []
-        for router in self.rs:
-            bandwidth = int(router['Пропускная способность'].split()[0])
-            if bandwidth >= flow:
-                cost = int(router['Стоимость'].split()[0])
-                suitable_routers.append((router, cost))
-
-        # Сортируем по стоимости и выбираем top_n
-        suitable_routers.sort(key=lambda x: x[1])
-        return [x[0] for x in suitable_routers[:top_n]]
+        return self.router_catalog.best(flow, top_n)
 
     def normalize_value(self, value, min_value, max_value):
         """
@@ -776,127 +948,230 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def evaluate_configuration(self, config, channel_flows, packet_size):
         """
         Оценивает конфигурацию: вычисляет стоимость и среднюю задержку.
+        Конфигурация рассматривается как пространство из одного варианта на компонент
+        и оценивается тем же пакетным кодом, что и полный перебор.
         """
-        total_cost = 0
-        edge_delays = {}
-
-        # Вычисляем стоимость и задержку для каналов
-        for edge, channel in config['channels'].items():
-            bandwidth = int(channel['Пропускная способность'].split()[0])
-            cost = int(channel['Стоимость аренды'].split()[0])
-            flow = channel_flows[edge]
-
-            total_cost += cost
-
-            if bandwidth > flow:
-                delay = packet_size / (bandwidth - flow)
-                edge_delays[edge] = delay
-            else:
-                edge_delays[edge] = float('inf')  # Канал перегружен
-
-        # Вычисляем стоимость для маршрутизаторов
-        for node, router in config['routers'].items():
-            cost = int(router['Стоимость'].split()[0])
-            total_cost += cost
-
-        # Вычисляем среднюю задержку
-        if edge_delays:
-            average_delay = sum(edge_delays.values()) / len(edge_delays)
-        else:
-            average_delay = 0
-
+        space = configurations.ConfigurationSpace({edge: [channel] for edge, channel in config['channels'].items()},
+                                                  {node: [router] for node, router in config['routers'].items()})
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+        _, total_costs, average_delays = next(configurations.evaluate_blocks(space, costs, delays))
         return {
-            'total_cost': total_cost,
-            'average_delay': average_delay,
+            'total_cost': int(total_costs[0]),
+            'average_delay': float(average_delays[0]),
         }
 
     def generate_possible_configurations(self, channel_flows, node_flows, top_n=3):
         """
-        Генерирует все возможные конфигурации, используя только top_n лучших каналов и маршрутизаторов.
+        Возвращает пространство всех возможных конфигураций, используя только top_n лучших каналов
+        и маршрутизаторов. Конфигурации не хранятся в памяти, а декодируются по номеру при обходе.
         """
-        configurations = []
-
-        # Генерация конфигураций для каналов
+        # Варианты каналов
         channel_options = {}
         for edge, flow in channel_flows.items():
             if flow > 0:
                 channel_options[edge] = self.get_best_channels(flow, top_n)
 
-        # Генерация конфигураций для маршрутизаторов
+        # Варианты маршрутизаторов
         router_options = {}
         for node, flow in node_flows.items():
             if flow > 0:
                 router_options[node] = self.get_best_routers(flow, top_n)
 
-        # Формируем все возможные комбинации
-        from itertools import product
+        return configurations.ConfigurationSpace(channel_options, router_options)
 
-        # Получаем все возможные комбинации каналов
-        channel_combinations = list(product(*channel_options.values()))
+    def find_optimal_configuration(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3, workers=None):
+        """
+        Находит оптимальную конфигурацию полным перебором, используя только top_n лучших каналов и маршрутизаторов.
+        Границы нормировки известны заранее, поэтому каждая конфигурация оценивается один раз,
+        потоково блоками, и память не зависит от размера пространства.
+        Если есть взаимозаменяемые рёбра или узлы, перебирается сжатое пространство в текущем процессе.
+        :param workers: Число процессов; по умолчанию на больших пространствах используются все ядра.
+        """
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        if space.size == 0:
+            return None
+        if workers is None and space.size >= self.PARALLEL_SEARCH_MIN_CONFIGURATIONS:
+            workers = os.cpu_count()
+
+        # Строки каталога разбираются один раз, затем конфигурации оцениваются блоками средствами NumPy
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+
+        # Рёбра и узлы с одинаковыми вариантами взаимозаменяемы: перебираются только мультимножества вариантов
+        reduction = configurations.SymmetryReduction(space, costs, delays)
+        print(f"Полный перебор: {space.size} конфигураций, с учётом симметрии — {reduction.size}")
+        if reduction.size < space.size:
+            digits = reduction.search(alpha)
+        else:
+            best_index = configurations.exhaustive_search(space, costs, delays, alpha, workers)
+            digits = None if best_index is None else space.digits(best_index)
 
-        # Получаем все возможные комбинации маршрутизаторов
-        router_combinations = list(product(*router_options.values()))
+        # Возвращаем лучшую конфигурацию
+        if digits is not None:
+            return self.configuration_from_digits(space, digits, channel_flows, packet_size)
+        return None
 
-        # Формируем полные конфигурации
-        for ch_comb in channel_combinations:
-            for rt_comb in router_combinations:
-                config = {
-                    'channels': {edge: ch for edge, ch in zip(channel_options.keys(), ch_comb)},
-                    'routers': {node: rt for node, rt in zip(router_options.keys(), rt_comb)},
-                }
-                configurations.append(config)
+    def configuration_from_digits(self, space, digits, channel_flows, packet_size):
+        """
+        Собирает конфигурацию по номерам вариантов компонентов и дополняет её стоимостью и задержкой.
+        """
+        config = space.build(digits)
+        evaluation = self.evaluate_configuration(config, channel_flows, packet_size)
+        return {
+            'channels': config['channels'],
+            'routers': config['routers'],
+            'average_delay': evaluation['average_delay'],
+            'total_cost': evaluation['total_cost'],
+        }
 
-        return configurations
+    def find_optimal_configuration_separable(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3):
+        """
+        Находит ту же оптимальную конфигурацию, что и find_optimal_configuration, без перебора:
+        стоимость и средняя задержка — суммы по компонентам, поэтому границы нормировки
+        вычисляются аналитически, а каждый канал и маршрутизатор выбирается независимо.
+        """
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+        digits = configurations.solve_separable(space, costs, delays, alpha)
+        if digits is None:
+            return None
+        return self.configuration_from_digits(space, digits, channel_flows, packet_size)
+
+    def build_pareto_frontier(self, channel_flows, node_flows, packet_size, top_n=3):
+        """
+        Строит Парето-фронт конфигураций по стоимости и средней задержке,
+        из которого затем выбирается конфигурация для любого alpha или бюджета.
+        """
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+        return configurations.ParetoFrontier(space, costs, delays)
 
-    def find_optimal_configuration(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3):
+    def find_optimal_configuration_bnb(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3,
+                                       time_budget=5.0, constraint=None):
         """
-        Находит оптимальную конфигурацию, используя только top_n лучших каналов и маршрутизаторов.
+        Находит оптимальную конфигурацию методом ветвей и границ. В отличие от
+        find_optimal_configuration_separable допускает ограничения, связывающие компоненты
+        (например, make_router_capacity_constraint), и останавливается по истечении time_budget секунд.
+        :param constraint: Функция constraint(space) -> is_feasible(digits) или None.
+        :return: Лучшая найденная конфигурация с ключами 'optimality_gap' (разрыв до доказанной оценки снизу
+                 в единицах общего показателя) и 'proven_optimal', либо None, если допустимых конфигураций нет.
         """
-        # Генерируем все возможные конфигурации
-        configurations = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        if space.size == 0:
+            return None
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+        bounds = configurations.normalization_bounds(space, costs, delays)
+        scores = configurations.component_scores(space, costs, delays, alpha, bounds)
+
+        is_feasible = constraint(space) if constraint else None
+        result = configurations.branch_and_bound(scores, is_feasible, time_budget)
+        if result.digits is None:
+            return None
+
+        config = self.configuration_from_digits(space, result.digits, channel_flows, packet_size)
+        config['optimality_gap'] = result.gap
+        config['proven_optimal'] = result.proven
+        return config
 
-        # Вычисляем минимальные и максимальные значения стоимости и задержки
-        costs = []
-        delays = []
-        for config in configurations:
-            evaluation = self.evaluate_configuration(config, channel_flows, packet_size)
-            costs.append(evaluation['total_cost'])
-            delays.append(evaluation['average_delay'])
+    def iter_optimal_configurations_annealing(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3,
+                                              seed=None, iterations=100000, time_budget=5.0, constraint=None):
+        """
+        Ищет оптимальную конфигурацию имитацией отжига и выдаёт каждую найденную конфигурацию,
+        которая лучше предыдущих. Подходит для сетей, где точные методы не успевают;
+        ограничения задаются так же, как для find_optimal_configuration_bnb.
+        """
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        if space.size == 0:
+            return
+        costs, delays = configurations.option_tables(space, channel_flows, packet_size, self.total_traffic())
+        bounds = configurations.normalization_bounds(space, costs, delays)
+        scores = configurations.component_scores(space, costs, delays, alpha, bounds)
 
-        min_cost = min(costs)
-        max_cost = max(costs)
-        min_delay = min(delays)
-        max_delay = max(delays)
+        is_feasible = constraint(space) if constraint else None
+        for solution in configurations.simulated_annealing(scores, is_feasible, seed, iterations, time_budget):
+            yield self.configuration_from_digits(space, solution.digits, channel_flows, packet_size)
 
-        # Выбираем конфигурацию с минимальным общим показателем
+    def find_optimal_configuration_annealing(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3,
+                                             seed=None, iterations=100000, time_budget=5.0, constraint=None):
+        """
+        Находит конфигурацию имитацией отжига, показывая текущую лучшую в строке состояния,
+        пока поиск продолжается. На время поиска окно блокируется: обработка событий
+        не должна запускать расчёт повторно.
+        :return: Лучшая найденная конфигурация или None, если допустимых конфигураций нет.
+        """
         best_config = None
-        best_score = float('inf')
-
-        for config in configurations:
-            evaluation = self.evaluate_configuration(config, channel_flows, packet_size)
-            score = self.calculate_total_score(
-                evaluation['total_cost'], evaluation['average_delay'],
-                min_cost, max_cost, min_delay, max_delay, alpha
-            )
-
-            if score < best_score:
-                best_score = score
+        self.centralwidget.setEnabled(False)
+        self.menubar.setEnabled(False)
+        try:
+            for config in self.iter_optimal_configurations_annealing(channel_flows, node_flows, packet_size, alpha,
+                                                                     top_n, seed, iterations, time_budget, constraint):
                 best_config = config
-
-        # Возвращаем лучшую конфигурацию
-        if best_config:
-            evaluation = self.evaluate_configuration(best_config, channel_flows, packet_size)
-            return {
-                'channels': best_config['channels'],
-                'routers': best_config['routers'],
-                'average_delay': evaluation['average_delay'],
-                'total_cost': evaluation['total_cost'],
-            }
-        return None
-
-
-app = QtWidgets.QApplication(sys.argv)
-
-window = MainWindow()
-window.show()
-app.exec()
+                self.statusbar.showMessage(f"Поиск конфигурации: стоимость {config['total_cost']} рублей, "
+                                           f"средняя задержка {config['average_delay']:.6f} секунд")
+                QtWidgets.QApplication.processEvents()
+        finally:
+            self.centralwidget.setEnabled(True)
+            self.menubar.setEnabled(True)
+            self.statusbar.clearMessage()
+        return best_config
+
+    def find_optimal_configuration_auto(self, channel_flows, node_flows, packet_size, alpha=0.5, top_n=3,
+                                        constraint=None, reference=False):
+        """
+        Находит оптимальную конфигурацию методом, который выбирает планировщик по размеру пространства
+        конфигураций, и сообщает, какой метод выбран и почему.
+        :param constraint: Функция constraint(space) -> is_feasible(digits) или None.
+        :param reference: Предпочесть полный перебор, если он укладывается в пределы времени и памяти.
+        """
+        space = self.generate_possible_configurations(channel_flows, node_flows, top_n)
+        workers = os.cpu_count() if space.size >= self.PARALLEL_SEARCH_MIN_CONFIGURATIONS else None
+        plan = configurations.plan_search(space, constraint is not None, reference, workers)
+        print(f"Поиск оптимальной конфигурации: {configurations.SEARCH_ENGINES[plan.engine]} — {plan.reason} "
+              f"(конфигураций: {plan.size if plan.size < 10 ** 9 else f'~10^{len(str(plan.size)) - 1}'}, "
+              f"полный перебор: ~{plan.estimated_seconds:.3g} с, ~{plan.estimated_bytes / 2 ** 20:.3g} МБ)")
+
+        if plan.engine == 'exhaustive':
+            return self.find_optimal_configuration(channel_flows, node_flows, packet_size, alpha, top_n, workers)
+        if plan.engine == 'separable':
+            return self.find_optimal_configuration_separable(channel_flows, node_flows, packet_size, alpha, top_n)
+        if plan.engine == 'bnb':
+            return self.find_optimal_configuration_bnb(channel_flows, node_flows, packet_size, alpha, top_n,
+                                                       constraint=constraint)
+        return self.find_optimal_configuration_annealing(channel_flows, node_flows, packet_size, alpha, top_n,
+                                                         constraint=constraint)
+
+    def make_router_capacity_constraint(self, space):
+        """
+        Ограничение на конфигурацию (флажок «Маршрутизатор ≥ канала»): пропускная способность маршрутизатора
+        должна быть не меньше пропускной способности каждого выбранного канала, подключённого к узлу,
+        чтобы маршрутизатор не становился узким местом.
+        """
+        channel_count = len(space.edges)
+        incident = {node: [i for i, edge in enumerate(space.edges) if node in edge] for node in space.nodes}
+        router_position = {node: channel_count + i for i, node in enumerate(space.nodes)}
+        # Канал проверяется маршрутизаторами двух своих узлов, маршрутизатор — только при своём выборе
+        dependents = [[router_position[node] for node in edge if node in router_position] for edge in space.edges]
+        dependents += [[position] for position in router_position.values()]
+        # Пропускные способности вариантов разбираются один раз, а не при каждой проверке
+        bandwidths = [[configurations.parse_number(option['Пропускная способность']) for option in options]
+                      for options in space.options]
+
+        def is_feasible(digits):
+            position = len(digits) - 1
+            if position < channel_count:
+                return True  # Каналы выбираются раньше маршрутизаторов, проверяем при выборе маршрутизатора
+            node = space.nodes[position - channel_count]
+            router_bandwidth = bandwidths[position][digits[position]]
+            return all(bandwidths[i][digits[i]] <= router_bandwidth for i in incident[node])
+
+        # Для имитации отжига: после смены варианта проверяются только зависящие от него маршрутизаторы
+        is_feasible.affected = dependents.__getitem__
+        return is_feasible
+
+
+if __name__ == '__main__':
+    # Защита нужна процессам пула маршрутизации: они импортируют этот модуль заново
+    app = QtWidgets.QApplication(sys.argv)
+
+    window = MainWindow()
+    window.show()
+    app.exec()
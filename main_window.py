@@ -88,8 +88,14 @@ class Ui_MainWindow(object):
         self.editButton.setGeometry(QtCore.QRect(830, 0, 151, 41))
         self.editButton.setObjectName("editButton")
         self.open_config_button = QtWidgets.QPushButton(parent=self.centralwidget)
-        self.open_config_button.setGeometry(QtCore.QRect(320, 504, 181, 51))
+        self.open_config_button.setGeometry(QtCore.QRect(315, 504, 186, 26))
         self.open_config_button.setObjectName("open_config_button")
+        self.routingCombo = QtWidgets.QComboBox(parent=self.centralwidget)
+        self.routingCombo.setGeometry(QtCore.QRect(10, 504, 300, 26))
+        self.routingCombo.setObjectName("routingCombo")
+        self.routerConstraintCheck = QtWidgets.QCheckBox(parent=self.centralwidget)
+        self.routerConstraintCheck.setGeometry(QtCore.QRect(315, 537, 186, 22))
+        self.routerConstraintCheck.setObjectName("routerConstraintCheck")
         self.plotWidget.raise_()
         self.inputButton.raise_()
         self.labelInput.raise_()
@@ -105,6 +111,8 @@ class Ui_MainWindow(object):
         self.clearButton.raise_()
         self.editButton.raise_()
         self.open_config_button.raise_()
+        self.routingCombo.raise_()
+        self.routerConstraintCheck.raise_()
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(parent=MainWindow)
         self.menubar.setGeometry(QtCore.QRect(0, 0, 1000, 21))
@@ -139,6 +147,8 @@ class Ui_MainWindow(object):
         self.clearButton.setText(_translate("MainWindow", "Сброс"))
         self.editButton.setText(_translate("MainWindow", "Редактировать данные"))
         self.open_config_button.setText(_translate("MainWindow", "Рассчитать конфигурации"))
+        self.routerConstraintCheck.setToolTip(_translate("MainWindow", "Пропускная способность маршрутизатора узла не меньше пропускной способности каждого подключённого канала"))
+        self.routerConstraintCheck.setText(_translate("MainWindow", "Маршрутизатор ≥ канала"))
         self.menufgh.setTitle(_translate("MainWindow", "Файл"))
         self.action_open.setText(_translate("MainWindow", "Открыть файл"))
         self.action_save.setText(_translate("MainWindow", "Сохранить файл"))
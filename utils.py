@@ -1,99 +1,1019 @@
-from collections import deque
+import heapq
+import math
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
+import networkx as nx
+import numpy as np
 from PyQt6 import QtWidgets
 from PyQt6.QtGui import QColor
 from PyQt6.QtWidgets import QAbstractItemView, QMessageBox
 
 
-def choose_least_loaded_path(graph, start, end, channel_flows):
+class CompactGraph:
     """
-    Выбирает наименее загруженный кратчайший путь между start и end.
+    Компактное представление графа для маршрутизации: узлы пронумерованы,
+    смежность хранится в формате CSR, у каждого ребра есть целочисленный номер.
+    Порядок соседей в строке CSR совпадает с порядком graph.neighbors.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.names = list(graph.nodes)  # Номер узла -> имя
+        self.index = {name: i for i, name in enumerate(self.names)}  # Имя узла -> номер
+        self.edge_keys = []  # Номер ребра -> (узел1, узел2) в каноническом порядке
+        self.edge_index = {}  # (узел1, узел2) -> номер ребра
+        self.edge_u = array('l')  # Номер ребра -> номер первого узла
+        self.edge_v = array('l')  # Номер ребра -> номер второго узла
+        self.indptr = array('l', [0])  # Начало строки смежности каждого узла
+        self.neighbors = array('l')  # Номера соседей
+        self.edge_ids = array('l')  # Номера рёбер, ведущих к соседям
+        self._weights = {}
+
+        for name in self.names:
+            for neighbor in graph.neighbors(name):
+                key = tuple(sorted([name, neighbor]))
+                if key not in self.edge_index:
+                    self.edge_index[key] = len(self.edge_keys)
+                    self.edge_keys.append(key)
+                    self.edge_u.append(self.index[key[0]])
+                    self.edge_v.append(self.index[key[1]])
+                self.neighbors.append(self.index[neighbor])
+                self.edge_ids.append(self.edge_index[key])
+            self.indptr.append(len(self.neighbors))
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_keys)
+
+    def other_end(self, edge_id, node):
+        """other_end(edge_id, node) возвращает второй конец ребра edge_id"""
+        return self.edge_u[edge_id] + self.edge_v[edge_id] - node
+
+    def edge_weights(self, weight):
+        """edge_weights(weight) возвращает веса рёбер из атрибута weight в порядке номеров рёбер"""
+        if weight not in self._weights:
+            self._weights[weight] = array('d', (self.graph[u][v][weight] for u, v in self.edge_keys))
+        return self._weights[weight]
+
+    def __getstate__(self):
+        # Граф networkx в процессы пула не передаём: веса рёбер к этому моменту уже извлечены
+        state = self.__dict__.copy()
+        state['graph'] = None
+        return state
+
+    def node_flows(self, edge_flows):
+        """
+        node_flows(edge_flows) суммирует потоки рёбер (по номерам) в потоки узлов (по номерам)
+        двумя bincount по концам рёбер.
+        """
+        edge_flows = np.asarray(edge_flows, dtype=float)
+        flows = (np.bincount(np.asarray(self.edge_u), weights=edge_flows, minlength=self.num_nodes)
+                 + np.bincount(np.asarray(self.edge_v), weights=edge_flows, minlength=self.num_nodes))
+        return flows.tolist()
+
+
+ShortestPathDag = namedtuple('ShortestPathDag', ['source', 'dist', 'preds', 'counts', 'order'])
+
+
+def build_shortest_path_dag(compact, start):
+    """
+    Строит DAG кратчайших путей из start обходом в ширину за O(V + E).
+    :param compact: Граф сети (CompactGraph).
+    :param start: Номер узла-источника.
+    :return: ShortestPathDag: расстояния (в рёбрах, -1 для недостижимых узлов), номера рёбер
+             от предшественников на кратчайших путях, число кратчайших путей до каждого узла
+             и порядок обхода узлов.
+    """
+    indptr, neighbors, edge_ids = compact.indptr, compact.neighbors, compact.edge_ids
+    dist = [-1] * compact.num_nodes
+    preds = [[] for _ in range(compact.num_nodes)]
+    counts = [0] * compact.num_nodes
+    dist[start] = 0
+    counts[start] = 1
+    order = [start]
+    queue = deque([start])
+
+    while queue:
+        current_node = queue.popleft()
+        next_dist = dist[current_node] + 1
+        for k in range(indptr[current_node], indptr[current_node + 1]):
+            neighbor = neighbors[k]
+            if dist[neighbor] == -1:
+                dist[neighbor] = next_dist
+                preds[neighbor].append(edge_ids[k])
+                counts[neighbor] = counts[current_node]
+                order.append(neighbor)
+                queue.append(neighbor)
+            elif dist[neighbor] == next_dist:
+                # Ещё один кратчайший путь в neighbor через current_node
+                preds[neighbor].append(edge_ids[k])
+                counts[neighbor] += counts[current_node]
+
+    return ShortestPathDag(start, dist, preds, counts, order)
+
+
+def build_weighted_shortest_path_dag(compact, start, weight='weight'):
+    """
+    Строит DAG кратчайших по весу путей из start алгоритмом Дейкстры на двоичной куче.
+    Веса рёбер берутся из атрибута weight и должны быть положительными.
+    :return: ShortestPathDag: расстояния (сумма весов, -1 для недостижимых узлов), номера рёбер
+             от предшественников на кратчайших путях, число кратчайших путей до каждого узла
+             и порядок, в котором узлы получили окончательное расстояние.
+    """
+    indptr, neighbors, edge_ids = compact.indptr, compact.neighbors, compact.edge_ids
+    weights = compact.edge_weights(weight)
+    dist = [-1] * compact.num_nodes
+    preds = [[] for _ in range(compact.num_nodes)]
+    counts = [0] * compact.num_nodes
+    settled = [False] * compact.num_nodes
+    dist[start] = 0
+    counts[start] = 1
+    order = []
+    heap = [(0, start)]
+
+    while heap:
+        current_dist, current_node = heapq.heappop(heap)
+        if settled[current_node]:
+            continue
+        settled[current_node] = True
+        order.append(current_node)
+
+        for k in range(indptr[current_node], indptr[current_node + 1]):
+            neighbor = neighbors[k]
+            if settled[neighbor]:
+                continue
+            new_dist = current_dist + weights[edge_ids[k]]
+            tolerance = 1e-9 * max(1.0, abs(new_dist))
+            if dist[neighbor] == -1 or new_dist < dist[neighbor] - tolerance:
+                dist[neighbor] = new_dist
+                preds[neighbor] = [edge_ids[k]]
+                counts[neighbor] = counts[current_node]
+                heapq.heappush(heap, (new_dist, neighbor))
+            elif abs(new_dist - dist[neighbor]) <= tolerance:
+                # Ещё один кратчайший путь той же длины
+                preds[neighbor].append(edge_ids[k])
+                counts[neighbor] += counts[current_node]
+
+    return ShortestPathDag(start, dist, preds, counts, order)
+
+
+def set_link_lengths(graph, points, lengths=None, weight='weight'):
+    """
+    Записывает в атрибут weight рёбер графа длину канала.
+    Длина берётся из словаря lengths ((узел1, узел2) -> длина), а при его отсутствии
+    вычисляется как евклидово расстояние между координатами X, Y узлов из points.
+    """
+    lengths = lengths or {}
+    coordinates = {point['Имя узла']: (point['X'], point['Y']) for point in points}
+    for node1, node2, data in graph.edges(data=True):
+        length = lengths.get(tuple(sorted([node1, node2])))
+        if length is None:
+            (x1, y1), (x2, y2) = coordinates[node1], coordinates[node2]
+            length = math.hypot(x2 - x1, y2 - y1)
+        # Нулевая длина сделала бы DAG кратчайших путей неоднозначным
+        data[weight] = max(float(length), 1e-6)
+
+
+def topology_fingerprint(graph):
+    """
+    Возвращает отпечаток топологии: узлы и их соседи в порядке обхода.
+    Порядок соседей входит в отпечаток, так как от него зависит выбор пути при равной загрузке.
+    Веса рёбер не входят: маршруты по числу переходов от координат узлов не зависят.
+    """
+    return tuple((node, tuple(graph[node])) for node in graph.nodes)
+
+
+def weight_fingerprint(graph, weight):
+    """
+    Возвращает отпечаток весов рёбер из атрибута weight (в порядке обхода рёбер графа).
+    Дополняет topology_fingerprint для маршрутов, кратчайших по сумме весов.
+    """
+    return tuple(data.get(weight) for _, _, data in graph.edges(data=True))
+
+
+class RoutingCache:
+    """Компактный граф и кэш DAG кратчайших путей по источникам для одной топологии сети"""
+
+    def __init__(self, graph, fingerprint=None):
+        self.graph = graph
+        self.fingerprint = topology_fingerprint(graph) if fingerprint is None else fingerprint
+        self.compact = CompactGraph(graph)
+        self.dags = {}
+        self.weight_fingerprints = {}  # weight -> отпечаток весов, по которым построены DAG
+
+    def dag(self, source, weight=None):
+        """
+        dag(source, weight) возвращает DAG кратчайших путей из узла с номером source,
+        строя его при первом обращении. Без weight пути кратчайшие по числу переходов,
+        иначе — по сумме весов рёбер.
+        """
+        key = (source, weight)
+        if key not in self.dags:
+            if weight is None:
+                self.dags[key] = build_shortest_path_dag(self.compact, source)
+            else:
+                self.weight_fingerprints.setdefault(weight, weight_fingerprint(self.graph, weight))
+                self.dags[key] = build_weighted_shortest_path_dag(self.compact, source, weight)
+        return self.dags[key]
+
+    def refresh(self, graph):
+        """
+        refresh(graph) переключает кэш на граф той же топологии. DAG по числу переходов сохраняются,
+        а взвешенные DAG сбрасываются только для весов, которые изменились (например, после перемещения узла).
+        """
+        self.graph = self.compact.graph = graph
+        for weight, fingerprint in list(self.weight_fingerprints.items()):
+            if weight_fingerprint(graph, weight) != fingerprint:
+                del self.weight_fingerprints[weight]
+                self.compact._weights.pop(weight, None)
+                self.dags = {key: dag for key, dag in self.dags.items() if key[1] != weight}
+
+
+_routing_cache = None
+
+
+def get_routing_cache(graph):
+    """
+    Возвращает кэш DAG для топологии graph.
+    Кэш переиспользуется, пока не изменится набор узлов и каналов, иначе строится заново.
     """
-    shortest_paths = find_shortest_paths(graph, start, end)
-    if not shortest_paths:
+    global _routing_cache
+    fingerprint = topology_fingerprint(graph)
+    if _routing_cache is None or _routing_cache.fingerprint != fingerprint:
+        _routing_cache = RoutingCache(graph, fingerprint)
+    else:
+        _routing_cache.refresh(graph)
+    return _routing_cache
+
+
+def nodes_on_shortest_paths(compact, dag, end):
+    """
+    Возвращает множество номеров узлов, лежащих хотя бы на одном кратчайшем пути от источника DAG до end.
+    """
+    if dag.dist[end] == -1:
+        return set()
+
+    on_path = {end}
+    stack = [end]
+    while stack:
+        node = stack.pop()
+        for edge_id in dag.preds[node]:
+            pred = compact.other_end(edge_id, node)
+            if pred not in on_path:
+                on_path.add(pred)
+                stack.append(pred)
+    return on_path
+
+
+def iter_shortest_paths(compact, dag, end):
+    """
+    Лениво перечисляет кратчайшие пути от источника DAG до end в виде списков номеров узлов.
+    Пути выдаются в том же порядке, в каком их находил обход в ширину по путям.
+    """
+    on_path = nodes_on_shortest_paths(compact, dag, end)
+    if not on_path:
+        return
+
+    indptr, neighbors, edge_ids = compact.indptr, compact.neighbors, compact.edge_ids
+    path = [dag.source]
+    branches = [iter(range(indptr[dag.source], indptr[dag.source + 1]))]
+    while branches:
+        if path[-1] == end:
+            yield list(path)
+            path.pop()
+            branches.pop()
+            continue
+
+        for k in branches[-1]:
+            neighbor = neighbors[k]
+            if neighbor in on_path and edge_ids[k] in dag.preds[neighbor]:
+                path.append(neighbor)
+                branches.append(iter(range(indptr[neighbor], indptr[neighbor + 1])))
+                break
+        else:
+            path.pop()
+            branches.pop()
+
+
+def find_least_loaded_path(compact, dag, end, edge_flows):
+    """
+    Находит наименее загруженный кратчайший путь до end динамическим программированием по DAG.
+    Работает за время, линейное по размеру DAG, и при равной загрузке выбирает тот же путь,
+    что и перебор кратчайших путей в порядке обхода в ширину.
+    :param compact: Граф сети (CompactGraph).
+    :param dag: DAG кратчайших путей из источника (build_shortest_path_dag).
+    :param end: Номер узла назначения.
+    :param edge_flows: Текущие потоки по номерам рёбер.
+    :return: Список номеров рёбер пути от источника или None, если end недостижим.
+    """
+    on_path = nodes_on_shortest_paths(compact, dag, end)
+    if not on_path:
         return None
 
-    # Выбираем путь с минимальной суммарной загрузкой
-    min_load = float('inf')
-    best_path = None
+    # best_load[node] — минимальная суммарная загрузка пути от node до end
+    best_load = {node: float('inf') for node in on_path}
+    best_load[end] = 0
+    for node in sorted(on_path, key=dag.dist.__getitem__, reverse=True):
+        for edge_id in dag.preds[node]:
+            pred = compact.other_end(edge_id, node)
+            load = edge_flows[edge_id] + best_load[node]
+            if load < best_load[pred]:
+                best_load[pred] = load
+
+    # Восстанавливаем путь от источника, выбирая первого подходящего соседа
+    indptr, neighbors, edge_ids = compact.indptr, compact.neighbors, compact.edge_ids
+    path = []
+    current_node = dag.source
+    while current_node != end:
+        candidates = [
+            (edge_flows[edge_ids[k]] + best_load[neighbors[k]], k)
+            for k in range(indptr[current_node], indptr[current_node + 1])
+            if neighbors[k] in on_path and edge_ids[k] in dag.preds[neighbors[k]]
+        ]
+        min_load = min(load for load, _ in candidates)
+        k = next(k for load, k in candidates if load == min_load)
+        path.append(edge_ids[k])
+        current_node = neighbors[k]
+
+    return path
+
 
-    for path in shortest_paths:
-        total_load = 0
-        for i in range(len(path) - 1):
-            node1, node2 = path[i], path[i + 1]
-            edge = tuple(sorted([node1, node2]))
-            total_load += channel_flows.get(edge, 0)
+def find_path_with_capacity(compact, start, end, edge_flows, volume, capacity, weights=None):
+    """
+    Находит кратчайший путь от start до end только по каналам, которые выдержат ещё volume:
+    поток после добавления должен остаться меньше capacity. Путь не обязан быть кратчайшим в сети.
+    :param weights: Длины рёбер по номерам (CompactGraph.edge_weights) или None для числа переходов.
+    :return: Список номеров рёбер пути или None, если такого пути нет.
+    """
+    dist = {start: 0}
+    via = {start: None}  # Узел -> (предыдущий узел, номер ребра)
+    heap = [(0, start)]
+    indptr, neighbors, edge_ids = compact.indptr, compact.neighbors, compact.edge_ids
+    while heap:
+        d, node = heapq.heappop(heap)
+        if node == end:
+            break
+        if d > dist[node]:
+            continue
+        for k in range(indptr[node], indptr[node + 1]):
+            edge_id = edge_ids[k]
+            if edge_flows[edge_id] + volume >= capacity:
+                continue
+            neighbor = neighbors[k]
+            candidate = d + (weights[edge_id] if weights is not None else 1)
+            if candidate < dist.get(neighbor, float('inf')):
+                dist[neighbor] = candidate
+                via[neighbor] = (node, edge_id)
+                heapq.heappush(heap, (candidate, neighbor))
+
+    if end not in via:
+        return None
+    path = []
+    node = end
+    while via[node] is not None:
+        node, edge_id = via[node]
+        path.append(edge_id)
+    path.reverse()
+    return path
 
-        if total_load < min_load:
-            min_load = total_load
-            best_path = path
 
-    return best_path
+def choose_least_loaded_path(graph, start, end, channel_flows):
+    """
+    Выбирает наименее загруженный кратчайший путь между start и end.
+    """
+    routing_cache = get_routing_cache(graph)
+    compact = routing_cache.compact
+    edge_flows = [channel_flows.get(edge, 0) for edge in compact.edge_keys]
+    edges = find_least_loaded_path(compact, routing_cache.dag(compact.index[start]), compact.index[end], edge_flows)
+    return None if edges is None else path_names(compact, start, edges)
 
 
 def find_shortest_paths(graph, start, end):
     """
     Находит все кратчайшие пути между start и end в графе graph.
     """
-    queue = deque([(start, [start])])
-    shortest_paths = []
-    shortest_length = None
+    routing_cache = get_routing_cache(graph)
+    compact = routing_cache.compact
+    dag = routing_cache.dag(compact.index[start])
+    return [[compact.names[node] for node in path]
+            for path in iter_shortest_paths(compact, dag, compact.index[end])]
 
-    while queue:
-        current_node, path = queue.popleft()
-        if current_node == end:
-            if shortest_length is None:
-                shortest_length = len(path)
-            if len(path) == shortest_length:
-                shortest_paths.append(path)
-            continue
 
-        for neighbor in graph.neighbors(current_node):
-            if neighbor not in path:
-                queue.append((neighbor, path + [neighbor]))
+def path_names(compact, start, edges):
+    """
+    Переводит путь из номеров рёбер в список имён узлов, начиная с узла start.
+    """
+    node = compact.index[start]
+    path = [start]
+    for edge_id in edges:
+        node = compact.other_end(edge_id, node)
+        path.append(compact.names[node])
+    return path
 
-    return shortest_paths
+
+def to_channel_flows(compact, edge_flows, edge_order):
+    """
+    Переводит потоки по номерам рёбер в словарь (узел1, узел2) -> поток для рёбер из edge_order.
+    """
+    return {compact.edge_keys[edge_id]: edge_flows[edge_id] for edge_id in edge_order}
 
 
 def calculate_node_flows(graph, channel_flows):
     """
     Вычисляет сумму потоков, проходящих через каждый узел.
     """
-    node_flows = {node: 0 for node in graph.nodes}  # Инициализируем словарь
-
+    compact = get_routing_cache(graph).compact
+    edge_flows = [0] * compact.num_edges
     for edge, flow in channel_flows.items():
-        node1, node2 = edge
-        node_flows[node1] += flow
-        node_flows[node2] += flow
+        edge_flows[compact.edge_index[edge]] += flow
+    return dict(zip(compact.names, compact.node_flows(edge_flows)))
 
-    return node_flows
 
+def _assign_least_loaded(routing_cache, demands, weight=None):
+    """
+    Последовательно назначает требованиям (номер источника, номер назначения, объём)
+    наименее загруженные кратчайшие пути на компактном графе.
+    :return: (edge_flows, edge_order, routes) — потоки по номерам рёбер, номера нагруженных рёбер
+             в порядке первого появления и пути требований в виде списков номеров рёбер (None, если пути нет).
+    """
+    compact = routing_cache.compact
+    edge_flows = [0] * compact.num_edges
+    used = [False] * compact.num_edges
+    edge_order = []
+    routes = []
 
-def calculate_channel_flows(graph, loads):
+    for start, end, flow in demands:
+        # Выбираем наименее загруженный кратчайший путь
+        path = find_least_loaded_path(compact, routing_cache.dag(start, weight), end, edge_flows)
+        routes.append(path)
+        if path is None:
+            continue  # Если путь не найден, пропускаем
+
+        # Увеличиваем загрузку каналов на выбранном пути
+        for edge_id in path:
+            if not used[edge_id]:
+                used[edge_id] = True
+                edge_order.append(edge_id)
+            edge_flows[edge_id] += flow
+
+    return edge_flows, edge_order, routes
+
+
+def _compact_demands(compact, loads):
+    """
+    Переводит требования из матрицы нагрузки в тройки (номер источника, номер назначения, объём).
+    """
+    index = compact.index
+    return [(index[load['Из узла']], index[load['В узел']], load['Объём информации(в Бит/c)']) for load in loads]
+
+
+def calculate_channel_flows(graph, loads, weight=None):
     """
     Рассчитывает поток для каждого канала, выбирая один кратчайший путь.
+    Если задан weight, пути кратчайшие по сумме весов рёбер, а не по числу переходов.
+    """
+    routing_cache = get_routing_cache(graph)
+    compact = routing_cache.compact
+    edge_flows, edge_order, _ = _assign_least_loaded(routing_cache, _compact_demands(compact, loads), weight)
+    return to_channel_flows(compact, edge_flows, edge_order)
+
+
+def _route_sources(compact, mode, weight, shard):
+    """
+    Маршрутизирует требования группы источников независимо от остальной нагрузки.
+    :param mode: 'ecmp' — деление по всем кратчайшим путям, 'shortest' — первый кратчайший путь.
+    :param shard: Список пар (номер источника, словарь номер назначения -> объём).
+    :return: (edge_flows, used) — частичные потоки по номерам рёбер и признаки использованных рёбер.
+    """
+    edge_flows = [0] * compact.num_edges
+    used = [False] * compact.num_edges
+    no_load = [0] * compact.num_edges
+
+    for source, volumes in shard:
+        if weight is None:
+            dag = build_shortest_path_dag(compact, source)
+        else:
+            dag = build_weighted_shortest_path_dag(compact, source, weight)
+
+        if mode == 'shortest':
+            for end, volume in volumes.items():
+                # Без загрузки наименее загруженный путь — первый кратчайший в порядке обхода
+                for edge_id in find_least_loaded_path(compact, dag, end, no_load) or ():
+                    used[edge_id] = True
+                    edge_flows[edge_id] += volume
+            continue
+
+        # ECMP: один обратный проход по DAG, поток узла делится между предшественниками
+        # пропорционально числу кратчайших путей до них
+        passing = [0] * compact.num_nodes  # Поток, проходящий через узел к нему и дальше по DAG
+        for node in reversed(dag.order):
+            flow = passing[node] + (volumes.get(node, 0) if node != source else 0)
+            if not flow:
+                continue
+            for edge_id in dag.preds[node]:
+                pred = compact.other_end(edge_id, node)
+                share = flow * dag.counts[pred] / dag.counts[node]
+                used[edge_id] = True
+                edge_flows[edge_id] += share
+                passing[pred] += share
+
+    return edge_flows, used
+
+
+_worker_compact = None
+
+
+def _init_routing_worker(compact):
+    global _worker_compact
+    _worker_compact = compact
+
+
+def _route_sources_worker(task):
+    mode, weight, shard = task
+    return _route_sources(_worker_compact, mode, weight, shard)
+
+
+def route_by_source(graph, loads, mode='ecmp', weight=None, workers=None):
+    """
+    Маршрутизирует требования, не зависящие от порядка обработки, группируя их по источнику.
+    При workers > 1 группы источников распределяются по пулу процессов, а частичные
+    потоки по рёбрам складываются.
+    :param mode: 'ecmp' — деление по всем кратчайшим путям, 'shortest' — первый кратчайший путь.
+    :param weight: Атрибут веса рёбер для Дейкстры или None для числа переходов.
+    :param workers: Число процессов; None или 1 — расчёт в текущем процессе.
+    """
+    routing_cache = get_routing_cache(graph)
+    compact = routing_cache.compact
+    if weight is not None:
+        compact.edge_weights(weight)  # Веса нужны процессам до отправки графа
+
+    # Группируем требования по источнику
+    volumes_by_source = {}
+    for start, end, volume in _compact_demands(compact, loads):
+        volumes = volumes_by_source.setdefault(start, {})
+        volumes[end] = volumes.get(end, 0) + volume
+    sources = list(volumes_by_source.items())
+
+    if not workers or workers <= 1 or len(sources) < 2:
+        edge_flows, used = _route_sources(compact, mode, weight, sources)
+    else:
+        # Несколько групп на процесс, чтобы выровнять нагрузку
+        chunks = min(len(sources), workers * 4)
+        tasks = [(mode, weight, sources[i::chunks]) for i in range(chunks)]
+        edge_flows = np.zeros(compact.num_edges)
+        used = np.zeros(compact.num_edges, dtype=bool)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_routing_worker,
+                                 initargs=(compact,)) as pool:
+            for partial_flows, partial_used in pool.map(_route_sources_worker, tasks):
+                edge_flows += partial_flows
+                # Без рёбер процесс возвращает пустые списки, поэтому приводим их к bool явно
+                np.logical_or(used, np.asarray(partial_used, dtype=bool), out=used)
+        edge_flows = edge_flows.tolist()
+
+    edge_order = [edge_id for edge_id in range(compact.num_edges) if used[edge_id]]
+    return to_channel_flows(compact, edge_flows, edge_order)
+
+
+def calculate_ecmp_channel_flows(graph, loads, weight=None, workers=None):
+    """
+    Рассчитывает поток для каждого канала, деля каждое требование поровну между всеми
+    его кратчайшими путями (ECMP). Пути не перечисляются: для каждого источника
+    выполняется один обратный проход по DAG кратчайших путей, где поток, приходящий в узел,
+    делится между предшественниками пропорционально числу кратчайших путей до них.
+    """
+    return route_by_source(graph, loads, 'ecmp', weight, workers)
+
+
+def calculate_shortest_path_channel_flows(graph, loads, weight=None, workers=None):
+    """
+    Рассчитывает поток для каждого канала, направляя каждое требование целиком
+    по первому кратчайшему пути независимо от загрузки.
+    """
+    return route_by_source(graph, loads, 'shortest', weight, workers)
+
+
+class FlowState:
+    """
+    Состояние маршрутизации по наименее загруженным путям: путь каждого требования
+    и потоки по каналам и узлам. Позволяет обновлять потоки при изменении отдельных требований,
+    не перестраивая маршруты остальных.
+    """
+
+    def __init__(self, graph, loads, weight=None):
+        self.graph = graph
+        self.weight = weight
+        self.routing_cache = get_routing_cache(graph)
+        self.fingerprint = self.routing_cache.fingerprint
+        # Маршруты по сумме весов зависят и от весов рёбер, по числу переходов — только от топологии
+        self.weight_fingerprint = None if weight is None else weight_fingerprint(graph, weight)
+        compact = self.routing_cache.compact
+
+        self.edge_flows, edge_order, routes = _assign_least_loaded(
+            self.routing_cache, _compact_demands(compact, loads), weight)
+        self.channel_flows = to_channel_flows(compact, self.edge_flows, edge_order)
+        self.node_flows = dict(zip(compact.names, compact.node_flows(self.edge_flows)))
+        # (из узла, в узел) -> (объём, путь в виде номеров рёбер)
+        self.routes = {
+            (load['Из узла'], load['В узел']): (load['Объём информации(в Бит/c)'], route)
+            for load, route in zip(loads, routes)
+        }
+
+    def matches(self, graph):
+        """matches(graph) проверяет, что состояние построено для той же топологии (и тех же весов рёбер)"""
+        if topology_fingerprint(graph) != self.fingerprint:
+            return False
+        return self.weight is None or weight_fingerprint(graph, self.weight) == self.weight_fingerprint
+
+    def path(self, demand):
+        """path(demand) возвращает путь требования (из узла, в узел) в виде списка имён узлов или None"""
+        _, route = self.routes[demand]
+        return None if route is None else path_names(self.routing_cache.compact, demand[0], route)
+
+    def routing_matrix(self):
+        """
+        routing_matrix() возвращает текущие маршруты в виде RoutingMatrix (столбцы — все рёбра сети
+        в порядке номеров), например для расчёта сквозных задержек или потоков при других объёмах.
+        Строки есть у всех требований, в том числе с нулевым объёмом.
+        """
+        compact = self.routing_cache.compact
+        demands = list(self.routes)
+        indptr = [0]
+        indices = []
+        for demand in demands:
+            _, route = self.routes[demand]
+            indices.extend(route or ())
+            indptr.append(len(indices))
+        volumes = [self.routes[demand][0] for demand in demands]
+        return RoutingMatrix(compact.names, list(compact.edge_keys), demands, volumes, indptr, indices,
+                             [1.0] * len(indices))
+
+    def _add_path(self, path, flow, deltas):
+        for edge_id in path or ():
+            self.edge_flows[edge_id] += flow
+            deltas[edge_id] = deltas.get(edge_id, 0) + flow
+
+    def update(self, loads):
+        """
+        Приводит состояние к новой матрице нагрузки loads.
+        Снимает с сети изменившиеся и удалённые требования и заново прокладывает
+        только изменившиеся и новые, остальные маршруты сохраняются.
+        :return: (changed_edges, changed_nodes) — множества рёбер и узлов, поток которых изменился.
+        """
+        compact = self.routing_cache.compact
+        new_volumes = {(load['Из узла'], load['В узел']): load['Объём информации(в Бит/c)'] for load in loads}
+        deltas = {}
+
+        # Снимаем удалённые и изменившиеся требования
+        for demand, (volume, path) in list(self.routes.items()):
+            if new_volumes.get(demand) != volume:
+                self._add_path(path, -volume, deltas)
+                del self.routes[demand]
+
+        # Прокладываем новые и изменившиеся требования по текущей загрузке
+        for demand, volume in new_volumes.items():
+            if demand not in self.routes:
+                start, end = compact.index[demand[0]], compact.index[demand[1]]
+                dag = self.routing_cache.dag(start, self.weight)
+                path = find_least_loaded_path(compact, dag, end, self.edge_flows)
+                self._add_path(path, volume, deltas)
+                self.routes[demand] = (volume, path)
+
+        return self._apply_deltas(deltas)
+
+    def reroute_overloaded(self, capacity, max_rounds=10):
+        """
+        Перекладывает требования с каналов, поток которых не меньше capacity (ни один канал каталога
+        не даёт на них конечной задержки), на пути с запасом пропускной способности — не обязательно кратчайшие.
+        Сначала перекладываются крупные требования. Проходы повторяются, пока все каналы не уложатся
+        в capacity или очередной проход ничего не изменит; остальные маршруты сохраняются.
+        :return: (changed_edges, changed_nodes), как у update.
+        """
+        compact = self.routing_cache.compact
+        weights = compact.edge_weights(self.weight) if self.weight is not None else None
+        deltas = {}
+        for _ in range(max_rounds):
+            overloaded = {edge_id for edge_id, flow in enumerate(self.edge_flows) if flow >= capacity}
+            if not overloaded:
+                break
+            candidates = sorted(
+                ((volume, demand) for demand, (volume, path) in self.routes.items()
+                 if path and not overloaded.isdisjoint(path)),
+                key=lambda candidate: -candidate[0])
+
+            moved = False
+            for volume, demand in candidates:
+                _, path = self.routes[demand]
+                if all(self.edge_flows[edge_id] < capacity for edge_id in path):
+                    continue  # Перегрузку уже сняли другие требования
+                self._add_path(path, -volume, deltas)
+                new_path = find_path_with_capacity(compact, compact.index[demand[0]], compact.index[demand[1]],
+                                                   self.edge_flows, volume, capacity, weights)
+                if new_path is None:
+                    new_path = path  # Обхода нет, требование остаётся на прежнем пути
+                moved = moved or new_path != path
+                self._add_path(new_path, volume, deltas)
+                self.routes[demand] = (volume, new_path)
+            if not moved:
+                break  # Неподвижная точка: ни одно требование нельзя переложить
+        return self._apply_deltas(deltas)
+
+    def _apply_deltas(self, deltas):
+        """
+        Переносит изменения потоков по рёбрам deltas в channel_flows и node_flows.
+        :return: (changed_edges, changed_nodes) — множества рёбер и узлов, поток которых изменился.
+        """
+        compact = self.routing_cache.compact
+        changed_edges = set()
+        node_deltas = {}
+        for edge_id, delta in deltas.items():
+            edge = compact.edge_keys[edge_id]
+            if self.edge_flows[edge_id] == 0:
+                self.channel_flows.pop(edge, None)
+            else:
+                self.channel_flows[edge] = self.edge_flows[edge_id]
+            if delta != 0:
+                changed_edges.add(edge)
+                for node in edge:
+                    node_deltas[node] = node_deltas.get(node, 0) + delta
+
+        changed_nodes = set()
+        for node, delta in node_deltas.items():
+            if delta != 0:
+                self.node_flows[node] += delta
+                changed_nodes.add(node)
+
+        return changed_edges, changed_nodes
+
+
+class RoutingMatrix:
+    """
+    Разреженная матрица маршрутизации «требование × канал» в формате CSR.
+    Маршруты фиксируются один раз, после чего потоки для любого вектора объёмов
+    считаются одним умножением матрицы на вектор.
+    """
+
+    def __init__(self, nodes, edges, demands, volumes, indptr, indices, data):
+        self.nodes = nodes  # Имена узлов
+        self.edges = edges  # Каналы (узел1, узел2) — столбцы матрицы
+        self.demands = demands  # Пары (из узла, в узел) в порядке строк матрицы
+        self.volumes = np.asarray(volumes, dtype=float)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+
+        node_index = {node: i for i, node in enumerate(nodes)}
+        self.edge_u = np.array([node_index[u] for u, _ in edges], dtype=np.int64)
+        self.edge_v = np.array([node_index[v] for _, v in edges], dtype=np.int64)
+        self.entry_rows = np.repeat(np.arange(len(demands)), np.diff(self.indptr))
+
+    def edge_flows(self, volumes=None):
+        """
+        edge_flows(volumes) возвращает потоки по каналам для вектора объёмов требований.
+        Можно передать матрицу (k × число требований) — тогда результат имеет размер k × число каналов.
+        """
+        volumes = self.volumes if volumes is None else np.asarray(volumes, dtype=float)
+        if volumes.ndim == 1:
+            return np.bincount(self.indices, weights=volumes[self.entry_rows] * self.data,
+                               minlength=len(self.edges))
+
+        flows = np.zeros((volumes.shape[0], len(self.edges)))
+        np.add.at(flows, (slice(None), self.indices), volumes[:, self.entry_rows] * self.data)
+        return flows
+
+    def node_flows(self, edge_flows):
+        """node_flows(edge_flows) суммирует потоки каналов по их концевым узлам"""
+        edge_flows = np.asarray(edge_flows, dtype=float)
+        size = len(self.nodes)
+        return (np.bincount(self.edge_u, weights=edge_flows, minlength=size)
+                + np.bincount(self.edge_v, weights=edge_flows, minlength=size))
+
+    def channel_flows(self, volumes=None):
+        """
+        channel_flows(volumes) возвращает потоки по всем каналам-столбцам матрицы в виде словаря,
+        включая каналы с нулевым потоком
+        """
+        return dict(zip(self.edges, self.edge_flows(volumes).tolist()))
+
+    def node_flow_dict(self, channel_flows):
+        """node_flow_dict(channel_flows) возвращает потоки узлов в виде словаря, как calculate_node_flows"""
+        edge_flows = [channel_flows.get(edge, 0) for edge in self.edges]
+        return dict(zip(self.nodes, self.node_flows(edge_flows).tolist()))
+
+
+def build_routing_matrix(graph, loads, weight=None):
+    """
+    Маршрутизирует требования наименее загруженными кратчайшими путями (как FlowState)
+    и сохраняет маршруты в виде RoutingMatrix — строка есть у каждого требования, в том числе
+    с нулевым объёмом. Потоки для других векторов объёмов (масштабирование нагрузки, Монте-Карло)
+    затем считаются по тем же маршрутам одним умножением, без повторного обхода путей.
+    :param weight: Атрибут веса рёбер для Дейкстры или None для числа переходов.
+    """
+    return FlowState(graph, loads, weight).routing_matrix()
+
+
+def _balance_objective(objective, capacity, scale):
+    """
+    Возвращает пару функций (значение, градиент) целевой функции балансировки от вектора потоков.
+    'max_load' — гладкое приближение максимальной загрузки: сумма (u / scale) ** 16, где u = поток / capacity;
+    'delay' — суммарная задержка M/M/1: сумма f / (capacity - f), продолженная квадратично за 99% загрузки.
+    """
+    if objective == 'max_load':
+        power = 16
+
+        def value(flows):
+            return float(np.sum((flows / capacity / scale) ** power))
+
+        def gradient(flows):
+            return power * (flows / capacity / scale) ** (power - 1) / (capacity * scale)
+
+        return value, gradient
+
+    if objective == 'delay':
+        limit = 0.99 * capacity
+
+        def value(flows):
+            safe = np.minimum(flows, limit)
+            over = flows - safe
+            d1 = capacity / (capacity - safe) ** 2
+            d2 = 2 * capacity / (capacity - safe) ** 3
+            return float(np.sum(safe / (capacity - safe) + d1 * over + d2 * over ** 2 / 2))
+
+        def gradient(flows):
+            safe = np.minimum(flows, limit)
+            return capacity / (capacity - safe) ** 2 + 2 * capacity / (capacity - safe) ** 3 * (flows - safe)
+
+        return value, gradient
+
+    raise ValueError(f"Неизвестная целевая функция балансировки: {objective}")
+
+
+def build_balanced_routing_matrix(graph, loads, objective='max_load', capacity=None,
+                                  max_paths=4, tolerance=1e-3, max_iterations=100):
+    """
+    Распределяет требования по нескольким путям методом Франка — Вульфа.
+    Результат не зависит от порядка требований в loads.
+    :param graph: Граф сети.
+    :param loads: Список требований (матрица нагрузки).
+    :param objective: 'max_load' — минимум максимальной загрузки каналов, 'delay' — минимум суммарной задержки M/M/1.
+    :param capacity: Пропускная способность канала (число или словарь ребро -> число).
+                     Для 'delay' обязательна, для 'max_load' задаёт загрузку как поток / capacity.
+    :param max_paths: Сколько кратчайших простых путей рассматривать для каждого требования.
+    :param tolerance: Допустимый относительный зазор двойственности для остановки.
+    :param max_iterations: Максимальное число итераций.
+    :return: RoutingMatrix, в которой доли требований распределены по путям.
     """
-    channel_flows = {}  # Словарь: (узел1, узел2) -> сумма потоков
+    if objective == 'delay' and capacity is None:
+        raise ValueError("Для минимизации задержки нужна пропускная способность каналов")
 
+    compact = get_routing_cache(graph).compact
+    all_edges = compact.edge_keys
+    edge_index = compact.edge_index
+    if capacity is None:
+        capacities = np.ones(len(all_edges))
+    elif isinstance(capacity, dict):
+        capacities = np.array([float(capacity[edge]) for edge in all_edges])
+    else:
+        capacities = np.full(len(all_edges), float(capacity))
+
+    # Кандидатные пути для каждого требования в виде массивов индексов рёбер
+    candidates = {}
+    demand_paths = []
+    volumes = []
     for load in loads:
-        start = load['Из узла']
-        end = load['В узел']
-        flow = load['Объём информации(в Бит/c)']
+        pair = (load['Из узла'], load['В узел'])
+        if pair not in candidates:
+            try:
+                paths = list(islice(nx.shortest_simple_paths(graph, *pair), max_paths))
+            except nx.NetworkXNoPath:
+                paths = []
+            candidates[pair] = [
+                np.array([edge_index[tuple(sorted([path[i], path[i + 1]]))] for i in range(len(path) - 1)],
+                         dtype=np.int64)
+                for path in paths
+            ]
+        demand_paths.append(candidates[pair])
+        volumes.append(float(load['Объём информации(в Бит/c)']))
 
-        # Выбираем наименее загруженный кратчайший путь
-        path = choose_least_loaded_path(graph, start, end, channel_flows)
-        if not path:
-            continue  # Если путь не найден, пропускаем
+    def all_or_nothing(choice):
+        flows = np.zeros(len(all_edges))
+        for paths, volume, p in zip(demand_paths, volumes, choice):
+            if paths:
+                np.add.at(flows, paths[p], volume)
+        return flows
 
-        # Увеличиваем загрузку каналов на выбранном пути
-        for i in range(len(path) - 1):
-            node1, node2 = path[i], path[i + 1]
-            edge = tuple(sorted([node1, node2]))  # Упорядочиваем рёбра для уникальности
-            if edge not in channel_flows:
-                channel_flows[edge] = 0
-            channel_flows[edge] += flow
-
-    return channel_flows
+    # Начальное решение: каждое требование целиком на первом кратчайшем пути
+    fractions = [np.eye(len(paths))[0] if paths else np.zeros(0) for paths in demand_paths]
+    flows = all_or_nothing([0] * len(demand_paths))
+    scale = max(float(np.max(flows / capacities, initial=0)), 1.0)
+    value, gradient = _balance_objective(objective, capacities, scale)
+
+    for _ in range(max_iterations):
+        grad = gradient(flows)
+
+        # Направление: каждое требование целиком на пути с минимальной предельной стоимостью
+        choice = [int(np.argmin([grad[path].sum() for path in paths])) if paths else 0 for paths in demand_paths]
+        target = all_or_nothing(choice)
+        direction = target - flows
+
+        gap = -float(grad @ direction)
+        if gap <= tolerance * max(float(grad @ flows), 1e-12):
+            break
+
+        # Одномерный поиск шага бисекцией по производной (целевая функция выпукла)
+        low, high = 0.0, 1.0
+        if float(gradient(flows + direction) @ direction) > 0:
+            for _ in range(40):
+                middle = (low + high) / 2
+                if float(gradient(flows + middle * direction) @ direction) > 0:
+                    high = middle
+                else:
+                    low = middle
+            step = low
+        else:
+            step = high
+        if step == 0 or value(flows + step * direction) >= value(flows):
+            break
+
+        flows = flows + step * direction
+        for d, p in enumerate(choice):
+            if len(fractions[d]):
+                fractions[d] = fractions[d] * (1 - step)
+                fractions[d][p] += step
+
+    # Переводим доли путей в разреженную матрицу «требование × канал»
+    edges = []
+    used_index = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for paths, shares in zip(demand_paths, fractions):
+        row = {}
+        for path, share in zip(paths, shares):
+            if share > 0:
+                for i in path:
+                    row[i] = row.get(i, 0) + share
+        for i, share in row.items():
+            edge = all_edges[i]
+            if edge not in used_index:
+                used_index[edge] = len(edges)
+                edges.append(edge)
+            indices.append(used_index[edge])
+            data.append(share)
+        indptr.append(len(indices))
+
+    demands = [(load['Из узла'], load['В узел']) for load in loads]
+    return RoutingMatrix(list(graph.nodes), edges, demands, volumes, indptr, indices, data)
+
+
+def calculate_balanced_channel_flows(graph, loads, objective='max_load', capacity=None,
+                                     max_paths=4, tolerance=1e-3, max_iterations=100):
+    """
+    Рассчитывает поток для каждого канала, распределяя требования по нескольким путям
+    так, чтобы минимизировать максимальную загрузку или суммарную задержку (см. build_balanced_routing_matrix).
+    """
+    matrix = build_balanced_routing_matrix(graph, loads, objective, capacity, max_paths, tolerance, max_iterations)
+    return matrix.channel_flows()
+
+
+ROUTING_MODES = {
+    'greedy': 'Наименее загруженный кратчайший путь',
+    'max_load': 'Балансировка: минимум максимальной загрузки',
+    'delay': 'Балансировка: минимум задержки M/M/1',
+    'ecmp': 'ECMP: деление по всем кратчайшим путям',
+    'shortest': 'Фиксированный кратчайший путь',
+    'distance': 'Кратчайший путь по длине каналов (Дейкстра)',
+    'feedback': 'Наименее загруженный путь с обходом перегрузок',
+}
+
+
+def route_demands(graph, loads, mode='greedy', capacity=None, workers=None):
+    """
+    Рассчитывает потоки по каналам выбранным алгоритмом маршрутизации (ключ из ROUTING_MODES).
+    workers задаёт число процессов для режимов, не зависящих от порядка требований ('ecmp', 'shortest').
+    """
+    if mode == 'greedy':
+        return calculate_channel_flows(graph, loads)
+    if mode == 'ecmp':
+        return calculate_ecmp_channel_flows(graph, loads, workers=workers)
+    if mode == 'shortest':
+        return calculate_shortest_path_channel_flows(graph, loads, workers=workers)
+    if mode == 'distance':
+        return calculate_channel_flows(graph, loads, weight='weight')
+    if mode in ('max_load', 'delay'):
+        return calculate_balanced_channel_flows(graph, loads, objective=mode, capacity=capacity)
+    if mode == 'feedback':
+        flow_state = FlowState(graph, loads)
+        if capacity is not None:
+            flow_state.reroute_overloaded(capacity)
+        return flow_state.channel_flows
+    raise ValueError(f"Неизвестный режим маршрутизации: {mode}")
 
 
 def error(message: str):